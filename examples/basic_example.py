@@ -4,16 +4,11 @@ Basic example of using the Adaptive RAG system.
 Requirements:
 - GROQ_API_KEY: Get from https://console.groq.com/
 - TAVILY_API_KEY: Get from https://tavily.com/
-- Optional: OPENAI_API_KEY for embeddings (HuggingFace used as fallback)
+- Optional: EMBEDDING_PROVIDER=openai and OPENAI_API_KEY for OpenAI embeddings (local HuggingFace by default)
 """
 
-import os
-import sys
 from dotenv import load_dotenv
 
-# Add the parent directory to the Python path to find the src module
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 # Load environment variables
 load_dotenv()
 
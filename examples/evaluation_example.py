@@ -4,16 +4,11 @@ Simple evaluation example using built-in evaluation system.
 Requirements:
 - GROQ_API_KEY: Get from https://console.groq.com/
 - TAVILY_API_KEY: Get from https://tavily.com/
-- Optional: OPENAI_API_KEY for embeddings (HuggingFace used as fallback)
+- Optional: EMBEDDING_PROVIDER=openai and OPENAI_API_KEY for OpenAI embeddings (local HuggingFace by default)
 """
 
-import os
-import sys
 from dotenv import load_dotenv
 
-# Add the parent directory to the Python path to find the src module
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 # Load environment variables
 load_dotenv()
 
@@ -74,7 +69,7 @@ def main():
         
         # Save results
         try:
-            df = evaluator.save_results_to_csv()
+            df = evaluator.save_results_to_csv(as_dataframe=True)
             print(f"\n📊 Results summary:")
             print(f"   Questions answered: {len(df)}")
             print(f"   Average response time: {df['response_time'].mean():.2f}s")
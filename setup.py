@@ -24,8 +24,8 @@ def run_command(command, description):
 def check_python_version():
     """Check if Python version is compatible."""
     version = sys.version_info
-    if version.major < 3 or (version.major == 3 and version.minor < 8):
-        print("❌ Python 3.8 or higher is required")
+    if version.major < 3 or (version.major == 3 and version.minor < 10):
+        print("❌ Python 3.10 or higher is required")
         return False
     print(f"✅ Python {version.major}.{version.minor}.{version.micro} is compatible")
     return True
@@ -56,7 +56,11 @@ def install_dependencies():
         print("❌ requirements.txt not found")
         return False
     
-    return run_command("pip install -r requirements.txt", "Installing dependencies")
+    if not run_command("pip install -r requirements.txt", "Installing dependencies"):
+        return False
+    
+    # Install the project itself so examples can `from src import ...` from anywhere
+    return run_command("pip install -e .", "Installing adaptive-rag package")
 
 
 def create_directories():
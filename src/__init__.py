@@ -2,10 +2,31 @@
 Adaptive RAG package initialization.
 """
 
-from .adaptive_rag import AdaptiveRAG
-from .document_processor import DocumentProcessor
-from .evaluator import SimpleEvaluator
+from importlib import import_module
+from typing import TYPE_CHECKING
+
 from .config import Config
 
+if TYPE_CHECKING:
+    from .adaptive_rag import AdaptiveRAG
+    from .document_processor import DocumentProcessor
+    from .evaluator import SimpleEvaluator
+
 __version__ = "1.0.0"
 __all__ = ["AdaptiveRAG", "DocumentProcessor", "SimpleEvaluator", "Config"]
+
+# Heavy submodules (LangGraph, FAISS, LLM clients) load on first attribute access
+_LAZY_EXPORTS = {
+    "AdaptiveRAG": ".adaptive_rag",
+    "DocumentProcessor": ".document_processor",
+    "SimpleEvaluator": ".evaluator",
+}
+
+
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
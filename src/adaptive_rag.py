@@ -2,18 +2,100 @@
 Main Adaptive RAG implementation using LangGraph and Groq.
 """
 
-from typing import List, Dict, Any
+import asyncio
+import logging
+import weakref
+from functools import lru_cache
+from typing import Callable, Iterable, List, Dict, Any, Sequence, Tuple
 from langchain_core.documents import Document
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 from langgraph.graph import END, StateGraph, START
 
+from .cache import SemanticCache
 from .models import GraphState
 from .router import QuestionRouter
 from .groq_retrieval import GroqDocumentRetriever
 from .retrieval import WebSearcher
 from .rag_chain import RAGChain
 from .graders import DocumentGrader, HallucinationGrader, AnswerGrader
+from .query_rewriter import QueryRewriter
 from .config import Config
 
+logger = logging.getLogger(__name__)
+
+# Shared by every instance so the sync graph can overlap independent grader calls; copying the
+# caller's context keeps those calls attached to the run's callbacks and traces
+_GRADER_EXECUTOR = ContextThreadPoolExecutor(max_workers=Config.GRADER_CONCURRENCY, thread_name_prefix="grader")
+
+
+def _bound(method_name: str, use_async: bool = False) -> Callable:
+    """Graph callable that dispatches to the AdaptiveRAG instance bound in the run config."""
+    if use_async:
+        async def call(state: GraphState, config: RunnableConfig):
+            return await getattr(config["configurable"]["rag"], method_name)(state)
+    else:
+        def call(state: GraphState, config: RunnableConfig):
+            return getattr(config["configurable"]["rag"], method_name)(state)
+    
+    call.__name__ = method_name
+    return call
+
+
+@lru_cache(maxsize=None)
+def _build_graph(use_async: bool = False):
+    """Build and compile the adaptive RAG graph once per mode; instances bind via config."""
+    workflow = StateGraph(GraphState)
+    
+    def node(name: str) -> Callable:
+        return _bound(f"_a{name}" if use_async else f"_{name}", use_async)
+    
+    # Add nodes
+    workflow.add_node("route_question", node("route_question"))
+    workflow.add_node("web_search", node("web_search"))
+    workflow.add_node("retrieve", node("retrieve"))
+    workflow.add_node("grade_documents", node("grade_documents"))
+    workflow.add_node("generate", node("generate"))
+    workflow.add_node("transform_query", node("transform_query"))
+    
+    # Add conditional edges
+    workflow.add_edge(START, "route_question")
+    workflow.add_conditional_edges(
+        "route_question",
+        _bound("_decide_route"),
+        {
+            "web_search": "web_search",
+            "vectorstore": "retrieve",
+        },
+    )
+    
+    workflow.add_edge("web_search", "generate")
+    workflow.add_edge("retrieve", "grade_documents")
+    
+    workflow.add_conditional_edges(
+        "grade_documents",
+        _bound("_decide_to_generate"),
+        {
+            "transform_query": "transform_query",
+            "generate": "generate",
+        },
+    )
+    
+    # Rewritten questions are re-retrieved from the source chosen on the first pass
+    workflow.add_edge("transform_query", "route_question")
+    
+    workflow.add_conditional_edges(
+        "generate",
+        node("grade_generation_v_documents_and_question"),
+        {
+            "not supported": "generate",
+            "useful": END,
+            "not useful": "transform_query",
+        },
+    )
+    
+    return workflow.compile()
+
 
 class AdaptiveRAG:
     """Main Adaptive RAG system that combines routing, retrieval, and generation using Groq."""
@@ -27,180 +109,287 @@ class AdaptiveRAG:
         self.document_grader = DocumentGrader()
         self.hallucination_grader = HallucinationGrader()
         self.answer_grader = AnswerGrader()
+        self.query_rewriter = QueryRewriter()
+        
+        # Cache answers for repeated or paraphrased questions in query_simple
+        self.answer_cache = SemanticCache(self.retriever.embeddings) if Config.ENABLE_ANSWER_CACHE else None
+        # Caches kept by callers (e.g. SimpleEvaluator) that also go stale when the vectorstore changes
+        self._dependent_caches: "weakref.WeakSet[SemanticCache]" = weakref.WeakSet()
         
-        # Build the graph
-        self.app = self._build_graph()
+        # Bind this instance to the shared compiled graphs; async_app uses non-blocking node methods
+        self.app = _build_graph(use_async=False).with_config(configurable={"rag": self})
+        self.async_app = _build_graph(use_async=True).with_config(configurable={"rag": self})
     
-    def setup_vectorstore(self, documents: List[Document]) -> None:
-        """Set up the vectorstore with documents."""
+    def setup_vectorstore(self, documents: Iterable[Document]) -> None:
+        """Set up the vectorstore with documents (a list or a stream such as DocumentProcessor.iter_csv)."""
         self.retriever.create_vectorstore(documents)
         self.retriever.save_vectorstore()
+        self.clear_cache()
     
     def load_vectorstore(self) -> None:
         """Load existing vectorstore."""
         self.retriever.load_vectorstore()
+        self.clear_cache()
     
-    def _build_graph(self) -> StateGraph:
-        """Build the adaptive RAG graph."""
-        workflow = StateGraph(GraphState)
-        
-        # Add nodes
-        workflow.add_node("web_search", self._web_search)
-        workflow.add_node("retrieve", self._retrieve)
-        workflow.add_node("grade_documents", self._grade_documents)
-        workflow.add_node("generate", self._generate)
-        workflow.add_node("transform_query", self._transform_query)
-        
-        # Add conditional edges
-        workflow.add_conditional_edges(
-            START,
-            self._route_question,
-            {
-                "web_search": "web_search",
-                "vectorstore": "retrieve",
-            },
-        )
-        
-        workflow.add_edge("web_search", "generate")
-        workflow.add_edge("retrieve", "grade_documents")
-        
-        workflow.add_conditional_edges(
-            "grade_documents",
-            self._decide_to_generate,
-            {
-                "transform_query": "transform_query",
-                "generate": "generate",
-            },
-        )
-        
-        workflow.add_edge("transform_query", "generate")
-        
-        workflow.add_conditional_edges(
-            "generate",
-            self._grade_generation_v_documents_and_question,
-            {
-                "not supported": "generate",
-                "useful": END,
-                "not useful": "transform_query",
-            },        )
-        
-        return workflow.compile()
+    def register_cache(self, cache: SemanticCache) -> None:
+        """Have clear_cache() also clear a cache built on this instance's results."""
+        self._dependent_caches.add(cache)
     
-    def _route_question(self, state: GraphState) -> str:
-        """Route question to appropriate data source."""
-        print("---ROUTE QUESTION---")
-        question = state["question"]
-        source = self.question_router.route(question)
+    def clear_cache(self) -> None:
+        """Drop cached answers, including registered caches, e.g. after the vectorstore changes."""
+        if self.answer_cache is not None:
+            self.answer_cache.clear()
+        for cache in list(self._dependent_caches):
+            cache.clear()
+    
+    def _route_question(self, state: GraphState) -> Dict[str, Any]:
+        """Route question to appropriate data source, reusing a decision already on the state."""
+        logger.debug("---ROUTE QUESTION---")
+        source = state.get("route")
+        if not source:
+            # Prefetched documents were fetched for a specific branch; guessing it would mix sources
+            if state.get("prefetched_documents") is not None:
+                raise ValueError("prefetched_documents requires the route they were fetched for")
+            source = self.question_router.route(state["question"])
+        return {"route": source}
+    
+    async def _aroute_question(self, state: GraphState) -> Dict[str, Any]:
+        """Async version of _route_question."""
+        logger.debug("---ROUTE QUESTION---")
+        source = state.get("route")
+        if not source:
+            # Prefetched documents were fetched for a specific branch; guessing it would mix sources
+            if state.get("prefetched_documents") is not None:
+                raise ValueError("prefetched_documents requires the route they were fetched for")
+            source = await self.question_router.aroute(state["question"])
+        return {"route": source}
+    
+    def _decide_route(self, state: GraphState) -> str:
+        """Pick the branch for the routing decision."""
+        source = state["route"]
         
         if source == "web_search":
-            print("---ROUTE QUESTION TO WEB SEARCH---")
+            logger.debug("---ROUTE QUESTION TO WEB SEARCH---")
             return "web_search"
         elif source == "vectorstore":
-            print("---ROUTE QUESTION TO RAG---")
+            logger.debug("---ROUTE QUESTION TO RAG---")
             return "vectorstore"
     
     def _retrieve(self, state: GraphState) -> Dict[str, Any]:
         """Retrieve documents from vectorstore."""
-        print("---RETRIEVE---")
+        logger.debug("---RETRIEVE---")
+        question = state["question"]
+        documents = state.get("prefetched_documents")
+        if documents is None:
+            documents = self.retriever.retrieve(question)
+        # Prefetched results only apply to the original question, not to retries
+        return {"documents": tuple(documents), "question": question, "prefetched_documents": None}
+    
+    async def _aretrieve(self, state: GraphState) -> Dict[str, Any]:
+        """Async version of _retrieve."""
+        logger.debug("---RETRIEVE---")
         question = state["question"]
-        documents = self.retriever.retrieve(question)
-        return {"documents": documents, "question": question}
+        documents = state.get("prefetched_documents")
+        if documents is None:
+            documents = await self.retriever.aretrieve(question)
+        return {"documents": tuple(documents), "question": question, "prefetched_documents": None}
     
     def _grade_documents(self, state: GraphState) -> Dict[str, Any]:
         """Grade documents for relevance."""
-        print("---CHECK DOCUMENT RELEVANCE TO QUESTION---")
+        logger.debug("---CHECK DOCUMENT RELEVANCE TO QUESTION---")
         question = state["question"]
         documents = state["documents"]
         
-        filtered_docs = []
-        for doc in documents:
-            score = self.document_grader.grade(question, doc.page_content)
-            if score == "yes":
-                print("---GRADE: DOCUMENT RELEVANT---")
-                filtered_docs.append(doc)
-            else:
-                print("---GRADE: DOCUMENT NOT RELEVANT---")
+        scores = self.document_grader.grade_batch(
+            question, [doc.page_content for doc in documents]
+        )
+        return {"documents": self._filter_documents(documents, scores), "question": question}
+    
+    async def _agrade_documents(self, state: GraphState) -> Dict[str, Any]:
+        """Async version of _grade_documents."""
+        logger.debug("---CHECK DOCUMENT RELEVANCE TO QUESTION---")
+        question = state["question"]
+        documents = state["documents"]
         
-        return {"documents": filtered_docs, "question": question}
+        scores = await self.document_grader.agrade_batch(
+            question, [doc.page_content for doc in documents]
+        )
+        return {"documents": self._filter_documents(documents, scores), "question": question}
+    
+    @staticmethod
+    def _filter_documents(documents: Sequence[Document], scores: List[str]) -> Tuple[Document, ...]:
+        """Keep the documents graded as relevant."""
+        filtered_docs = tuple(doc for doc, score in zip(documents, scores) if score == "yes")
+        if logger.isEnabledFor(logging.DEBUG):
+            for score in scores:
+                logger.debug("---GRADE: DOCUMENT %s---", "RELEVANT" if score == "yes" else "NOT RELEVANT")
+        return filtered_docs
     
     def _generate(self, state: GraphState) -> Dict[str, Any]:
         """Generate answer using RAG."""
-        print("---GENERATE---")
+        logger.debug("---GENERATE---")
+        question = state["question"]
+        documents = state["documents"]
+        
+        # Build the context once; the graders reuse it on every retry
+        docs_text = self.rag_chain.format_docs(documents)
+        generation = self.rag_chain.generate_from_context(question, docs_text)
+        return {
+            "documents": documents,
+            "question": question,
+            "generation": generation,
+            "docs_text": docs_text,
+        }
+    
+    async def _agenerate(self, state: GraphState) -> Dict[str, Any]:
+        """Async version of _generate."""
+        logger.debug("---GENERATE---")
         question = state["question"]
         documents = state["documents"]
         
-        generation = self.rag_chain.generate(question, documents)
-        return {"documents": documents, "question": question, "generation": generation}    
+        docs_text = self.rag_chain.format_docs(documents)
+        generation = await self.rag_chain.agenerate_from_context(question, docs_text)
+        return {
+            "documents": documents,
+            "question": question,
+            "generation": generation,
+            "docs_text": docs_text,
+        }
+    
     def _web_search(self, state: GraphState) -> Dict[str, Any]:
         """Perform web search."""
-        print("---WEB SEARCH---")
+        logger.debug("---WEB SEARCH---")
         question = state["question"]
-        
-        doc = self.web_searcher.search(question)
-        return {"documents": [doc], "question": question}
+        documents = state.get("prefetched_documents")
+        if documents is None:
+            documents = (self.web_searcher.search(question),)
+        return {"documents": tuple(documents), "question": question, "prefetched_documents": None}
     
-    def _transform_query(self, state: GraphState) -> Dict[str, Any]:
-        """Transform query for better results."""
-        print("---TRANSFORM QUERY---")
+    async def _aweb_search(self, state: GraphState) -> Dict[str, Any]:
+        """Async version of _web_search."""
+        logger.debug("---WEB SEARCH---")
         question = state["question"]
+        documents = state.get("prefetched_documents")
+        if documents is None:
+            documents = (await self.web_searcher.asearch(question),)
+        return {"documents": tuple(documents), "question": question, "prefetched_documents": None}
+    
+    def _transform_query(self, state: GraphState) -> Dict[str, Any]:
+        """Rewrite the question so the next retrieval pass can find better context."""
+        logger.debug("---TRANSFORM QUERY---")
         
         # Increment retry counter
         retry_count = state.get("retry_count", 0) + 1
-        print(f"---RETRY COUNT: {retry_count}---")
+        logger.debug("---RETRY COUNT: %d---", retry_count)
         
-        # Simple query transformation - you can make this more sophisticated
-        transformed_question = f"Please provide more details about: {question}"
+        question = self.query_rewriter.rewrite(state["question"])
+        return {"question": question, "documents": (), "retry_count": retry_count}
+    
+    async def _atransform_query(self, state: GraphState) -> Dict[str, Any]:
+        """Async version of _transform_query."""
+        logger.debug("---TRANSFORM QUERY---")
         
-        # For now, just return the same question
-        # In a real implementation, you might use another LLM to transform the query
-        return {
-            "question": question, 
-            "documents": state.get("documents", []),
-            "retry_count": retry_count
-        }
+        retry_count = state.get("retry_count", 0) + 1
+        logger.debug("---RETRY COUNT: %d---", retry_count)
+        
+        question = await self.query_rewriter.arewrite(state["question"])
+        return {"question": question, "documents": (), "retry_count": retry_count}
     
     def _decide_to_generate(self, state: GraphState) -> str:
         """Decide whether to generate answer or transform query."""
-        print("---ASSESS GRADED DOCUMENTS---")
+        logger.debug("---ASSESS GRADED DOCUMENTS---")
         filtered_documents = state["documents"]
         
-        if not filtered_documents:
-            print("---DECISION: ALL DOCUMENTS ARE NOT RELEVANT TO QUESTION, TRANSFORM QUERY---")
+        if not filtered_documents and state.get("retry_count", 0) >= Config.MAX_RETRIES:
+            logger.debug("---MAX RETRIES REACHED, GENERATING WITHOUT CONTEXT---")
+            return "generate"
+        elif not filtered_documents:
+            logger.debug("---DECISION: ALL DOCUMENTS ARE NOT RELEVANT TO QUESTION, TRANSFORM QUERY---")
             return "transform_query"
         else:
-            print("---DECISION: GENERATE---")
+            logger.debug("---DECISION: GENERATE---")
             return "generate"
     
     def _grade_generation_v_documents_and_question(self, state: GraphState) -> str:
         """Grade the generation against documents and question."""
-        print("---CHECK HALLUCINATIONS---")
+        logger.debug("---CHECK HALLUCINATIONS---")
+        if not self._has_context(state):
+            return self._judge_without_context(state)
+        
         question = state["question"]
-        documents = state["documents"]
         generation = state["generation"]
-          # Check hallucination
-        docs_text = "\n".join([doc.page_content for doc in documents])
-        score = self.hallucination_grader.grade(docs_text, generation)
         
+        # The answer check doesn't depend on the hallucination check, so run both at once
+        answer_future = _GRADER_EXECUTOR.submit(self.answer_grader.grade, question, generation)
+        score = None
+        try:
+            score = self.hallucination_grader.grade(state["docs_text"], generation)
+        finally:
+            # The answer score is only used for grounded generations; drop it if it hasn't started
+            if score != "yes":
+                answer_future.cancel()
+        
+        return self._judge_generation(state, score, answer_future.result)
+    
+    async def _agrade_generation_v_documents_and_question(self, state: GraphState) -> str:
+        """Async version that runs the hallucination and answer graders concurrently."""
+        logger.debug("---CHECK HALLUCINATIONS---")
+        if not self._has_context(state):
+            return self._judge_without_context(state)
+        
+        question = state["question"]
+        generation = state["generation"]
+        
+        answer_task = asyncio.ensure_future(self.answer_grader.agrade(question, generation))
+        try:
+            hallucination_score = await self.hallucination_grader.agrade(state["docs_text"], generation)
+        except BaseException:
+            answer_task.cancel()
+            raise
+        
+        if hallucination_score != "yes":
+            # The answer score is only used for grounded generations, so stop its request
+            answer_task.cancel()
+            return self._judge_generation(state, hallucination_score, lambda: "")
+        answer_score = await answer_task
+        return self._judge_generation(state, hallucination_score, lambda: answer_score)
+    
+    @staticmethod
+    def _has_context(state: GraphState) -> bool:
+        """Whether the generation had enough context for grounding checks to mean anything."""
+        return len(state.get("docs_text", "").strip()) >= Config.MIN_CONTEXT_CHARS
+    
+    def _judge_without_context(self, state: GraphState) -> str:
+        """Skip the graders when there is no context: retry the query, or give up after the last retry."""
+        if state.get("retry_count", 0) >= Config.MAX_RETRIES:
+            logger.debug("---NO CONTEXT AND MAX RETRIES REACHED, ACCEPTING ANSWER---")
+            return "useful"
+        logger.debug("---DECISION: NO CONTEXT TO GRADE AGAINST, TRANSFORM QUERY---")
+        return "not useful"
+    
+    def _judge_generation(self, state: GraphState, hallucination_score: str,
+                          grade_answer: Callable[[], str]) -> str:
+        """Turn grader scores into the next graph step."""
         # Check retry count to prevent infinite loops
         retry_count = state.get("retry_count", 0)
         
-        if score == "yes":
-            print("---DECISION: GENERATION IS GROUNDED IN DOCUMENTS---")
+        if hallucination_score == "yes":
+            logger.debug("---DECISION: GENERATION IS GROUNDED IN DOCUMENTS---")
             # Check question-answering
-            print("---GRADE GENERATION vs QUESTION---")
-            score = self.answer_grader.grade(question, generation)
+            logger.debug("---GRADE GENERATION vs QUESTION---")
+            score = grade_answer()
             if score == "yes":
-                print("---DECISION: GENERATION ADDRESSES QUESTION---")
+                logger.debug("---DECISION: GENERATION ADDRESSES QUESTION---")
                 return "useful"
             else:
-                print("---DECISION: GENERATION DOES NOT ADDRESS QUESTION---")
+                logger.debug("---DECISION: GENERATION DOES NOT ADDRESS QUESTION---")
                 # Limit retries to prevent infinite loops
-                if retry_count >= 3:
-                    print("---MAX RETRIES REACHED, ACCEPTING ANSWER---")
+                if retry_count >= Config.MAX_RETRIES:
+                    logger.debug("---MAX RETRIES REACHED, ACCEPTING ANSWER---")
                     return "useful"
                 return "not useful"
         else:
-            print("---DECISION: GENERATION IS NOT GROUNDED IN DOCUMENTS, RE-TRY---")
+            logger.debug("---DECISION: GENERATION IS NOT GROUNDED IN DOCUMENTS, RE-TRY---")
             return "not supported"
     
     def query(self, question: str) -> str:
@@ -222,6 +411,61 @@ class AdaptiveRAG:
         """Simple query without streaming output."""
         Config.validate()
         
+        if self.answer_cache is None:
+            return self._generation(self._answer(question))
+        
+        cached, probe = self.answer_cache.lookup(question)
+        if cached is not None:
+            return cached
+        
+        result = self._answer(question)
+        answer = self._generation(result)
+        if self.should_cache(result):
+            self.answer_cache.store(probe, answer)
+        return answer
+    
+    def _answer(self, question: str) -> Dict[str, Any]:
+        """Run the graph for a question and return its final state."""
+        inputs = {"question": question}
+        return self.app.invoke(inputs)
+    
+    async def query_async(self, question: str) -> str:
+        """Async query; retrieval, web search and LLM calls do not block the event loop."""
+        Config.validate()
+        
+        if self.answer_cache is None:
+            return self._generation(await self._aanswer(question))
+        
+        # The cache lookup may embed the question, so keep it off the event loop
+        loop = asyncio.get_running_loop()
+        cached, probe = await loop.run_in_executor(None, self.answer_cache.lookup, question)
+        if cached is not None:
+            return cached
+        
+        result = await self._aanswer(question)
+        answer = self._generation(result)
+        if self.should_cache(result):
+            self.answer_cache.store(probe, answer)
+        return answer
+    
+    async def _aanswer(self, question: str) -> Dict[str, Any]:
+        """Run the async graph for a question and return its final state."""
         inputs = {"question": question}
-        result = self.app.invoke(inputs)
+        return await self.async_app.ainvoke(inputs)
+    
+    @staticmethod
+    def _generation(result: Dict[str, Any]) -> str:
         return result.get("generation", "No answer generated")
+    
+    @staticmethod
+    def should_cache(result: Dict[str, Any]) -> bool:
+        """Whether a final graph state may be reused.
+        
+        Web-search answers depend on fresh data, and answers accepted without context or after
+        the graders ran out of retries are fallbacks that should get a fresh attempt next time.
+        """
+        return (
+            result.get("route") != "web_search"
+            and AdaptiveRAG._has_context(result)
+            and result.get("retry_count", 0) < Config.MAX_RETRIES
+        )
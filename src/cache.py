@@ -0,0 +1,172 @@
+"""
+Caching utilities for reusing answers to repeated or paraphrased questions.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .config import Config
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question for cache lookups (case and whitespace)."""
+    return " ".join(question.lower().split())
+
+
+class LRUCache:
+    """Thread-safe LRU mapping with an optional time-to-live per entry."""
+
+    def __init__(self, maxsize: int = Config.CACHE_MAX, ttl: Optional[float] = Config.CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for a key, or None if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> List[Hashable]:
+        """Store a value and return the keys evicted to make room for it."""
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            evicted = []
+            while len(self._data) > self.maxsize:
+                old_key, _ = self._data.popitem(last=False)
+                evicted.append(old_key)
+            return evicted
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CacheProbe(NamedTuple):
+    """Result of a cache lookup, reusable when storing the computed value."""
+    key: str
+    vector: Optional[np.ndarray]
+
+
+class SemanticCache:
+    """Two-tier question cache: exact hash lookup, then cosine similarity over embeddings."""
+
+    def __init__(
+        self,
+        embeddings,
+        maxsize: int = Config.CACHE_MAX,
+        threshold: float = Config.CACHE_SIM_THRESHOLD,
+        ttl: Optional[float] = Config.CACHE_TTL_SECONDS,
+    ):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self._entries = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+        # Question embeddings live in one contiguous matrix so lookups are a single dot product
+        self._maxsize = maxsize
+        self._vectors: Optional[np.ndarray] = None
+        self._occupied = np.zeros(maxsize, dtype=bool)
+        self._slot_keys: List[Optional[str]] = [None] * maxsize
+        self._slot_by_key: Dict[str, int] = {}
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, question: str) -> Tuple[Optional[Any], CacheProbe]:
+        """Look up a question, returning the cached value (or None) and a probe for store()."""
+        normalized = normalize_question(question)
+        key = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+        value = self._entries.get(key)
+        if value is not None:
+            return value, CacheProbe(key, None)
+
+        vector = self._embed(normalized)
+        with self._lock:
+            if self._vectors is None or not self._occupied.any():
+                return None, CacheProbe(key, vector)
+            scores = np.where(self._occupied, self._vectors @ vector, -np.inf)
+            best = int(np.argmax(scores))
+            best_key = self._slot_keys[best]
+            is_match = scores[best] >= self.threshold
+
+        if is_match:
+            value = self._entries.get(best_key)
+            if value is not None:
+                return value, CacheProbe(key, vector)
+            # The matching entry expired; drop its embedding as well
+            with self._lock:
+                self._release_slot(best_key)
+        return None, CacheProbe(key, vector)
+
+    def store(self, probe: CacheProbe, value: Any) -> None:
+        """Store a value for a previously probed question."""
+        evicted = self._entries.put(probe.key, value)
+
+        with self._lock:
+            for old_key in evicted:
+                self._release_slot(old_key)
+            if probe.vector is None or probe.key in self._slot_by_key:
+                return
+            free = np.flatnonzero(~self._occupied)
+            if not free.size:
+                # Reclaim slots whose entries expired without being looked up again
+                for stale_key in [k for k in self._slot_by_key if k not in self._entries]:
+                    self._release_slot(stale_key)
+                free = np.flatnonzero(~self._occupied)
+                if not free.size:
+                    return
+            if self._vectors is None:
+                self._vectors = np.zeros((self._maxsize, probe.vector.shape[0]), dtype=np.float32)
+            slot = int(free[0])
+            self._vectors[slot] = probe.vector
+            self._occupied[slot] = True
+            self._slot_keys[slot] = probe.key
+            self._slot_by_key[probe.key] = slot
+
+    def _release_slot(self, key: str) -> None:
+        slot = self._slot_by_key.pop(key, None)
+        if slot is not None:
+            self._occupied[slot] = False
+            self._slot_keys[slot] = None
+
+    def get_or_compute(self, question: str, compute: Callable[[str], Any]) -> Any:
+        """Return the cached value for a question, computing and storing it on a miss."""
+        value, probe = self.lookup(question)
+        if value is not None:
+            return value
+        value = compute(question)
+        self.store(probe, value)
+        return value
+
+    def clear(self) -> None:
+        """Remove all cached entries."""
+        self._entries.clear()
+        with self._lock:
+            self._occupied[:] = False
+            self._slot_keys = [None] * self._maxsize
+            self._slot_by_key.clear()
@@ -11,35 +11,80 @@ class Config:
     
     # API Keys
     GROQ_API_KEY: Optional[str] = os.getenv("GROQ_API_KEY")
-    OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")  # For embeddings only
+    OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")  # For OpenAI embeddings only
     TAVILY_API_KEY: Optional[str] = os.getenv("TAVILY_API_KEY")
     
     # Model configurations
     DEFAULT_MODEL: str = "llama3-8b-8192"  # Groq model
     ROUTER_MODEL: str = "llama3-70b-8192"  # Groq model for routing
-    EMBEDDING_MODEL: str = "text-embedding-ada-002"  # OpenAI for embeddings
+    EMBEDDING_PROVIDER: str = os.getenv("EMBEDDING_PROVIDER", "huggingface")  # "huggingface" or "openai"
+    EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")  # 384-d, local
+    OPENAI_EMBEDDING_MODEL: str = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002")
+    EMBEDDING_DEVICE: str = os.getenv("EMBEDDING_DEVICE", "auto")  # "auto" picks cuda, then mps, then cpu
+    EMBEDDING_FP16: bool = True  # Half-precision weights when running on CUDA
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "torch")  # "torch" or "onnx" (needs sentence-transformers[onnx])
+    EMBEDDING_ONNX_FILE: str = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_quint8_avx2.onnx")  # int8-quantized export
+    EMBED_BATCH_SIZE: int = 64  # Texts per forward pass for local embeddings
+    OPENAI_EMBED_CHUNK_SIZE: int = 512  # Texts per OpenAI embeddings request
+    INDEX_BATCH_SIZE: int = 512  # Chunks consumed per embedding call when building the index
+    USE_EMBEDDING_CACHE: bool = True  # Reuse vectors for unchanged chunks across runs
+    EMBEDDING_CACHE_PATH: str = "./data/emb_cache"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200_000  # One .npy per chunk; least recently used are pruned after indexing
     
     # Document processing
     CHUNK_SIZE: int = 500
     CHUNK_OVERLAP: int = 0
+    LOADER_CACHE_SIZE: int = 32  # Parsed files kept in memory, keyed by path and mtime
     
     # Retrieval settings
     RETRIEVAL_K: int = 4  # Number of documents to retrieve
     WEB_SEARCH_K: int = 3  # Number of web search results
+    MAX_CONTEXT_CHARS: int = 12_000  # Context budget per generation (~3k tokens); lowest-ranked docs dropped first
+    WEB_SEARCH_CONCURRENCY: int = 8  # Max parallel Tavily requests in search_many()
+    
+    # Routing settings
+    ROUTER_HEURISTICS: bool = True  # Send obvious real-time questions to web search without an LLM call
+    ROUTER_CONCURRENCY: int = 8  # Max parallel router LLM calls in route_many()
+    ROUTER_CACHE_SIZE: int = 1024  # Routing decisions remembered per router
+    
+    # Grading settings
+    GRADER_CONCURRENCY: int = 8  # Max parallel grader LLM calls
+    GRADER_BATCH_SIZE: int = 8  # Documents graded per batched LLM call, keeps prompts token-safe
+    MAX_RETRIES: int = 3  # Query rewrites before accepting the current answer
+    MIN_CONTEXT_CHARS: int = 50  # Shorter contexts skip the hallucination/answer graders
+    
+    # Evaluation settings
+    EVAL_CONCURRENCY: int = 4  # Questions evaluated in parallel by SimpleEvaluator
     
     # Temperature settings
     TEMPERATURE: float = 0.0
     
+    # Answer cache settings
+    ENABLE_ANSWER_CACHE: bool = True
+    CACHE_MAX: int = 1024  # Max cached questions
+    CACHE_SIM_THRESHOLD: float = 0.95  # Cosine similarity for a semantic cache hit
+    CACHE_TTL_SECONDS: Optional[float] = None  # None keeps entries until evicted
+    ENABLE_PROMPT_CACHE: bool = True  # Reuse grader/router responses for identical prompts
+    PROMPT_CACHE_SIZE: int = 4096  # Max cached LLM responses
+    
     # Vector store settings
     VECTOR_STORE_PATH: str = "./data/vectorstore"
+    HNSW_MIN_DOCS: int = 1000  # Below this, exact flat search is faster than HNSW
+    HNSW_M: int = 32  # Graph neighbours per node
+    HNSW_EF_CONSTRUCTION: int = 200
+    HNSW_EF_SEARCH: int = 64
+    USE_PQ: bool = True  # Product-quantize embeddings for large corpora
+    PQ_MIN_DOCS: int = 10_000  # Below this, PQ training costs more than it saves
+    PQ_NBITS: int = 8
+    PQ_NPROBE: int = 8  # IVF lists scanned per query
     
     @classmethod
     def validate(cls) -> bool:
         """Validate that required API keys are set."""
         if not cls.GROQ_API_KEY:
             raise ValueError("GROQ_API_KEY environment variable is required")
-        if not cls.OPENAI_API_KEY:
-            print("⚠️  OPENAI_API_KEY not set. Embeddings may not work properly.")
+        if cls.EMBEDDING_PROVIDER == "openai" and not cls.OPENAI_API_KEY:
+            print("⚠️  OPENAI_API_KEY not set. Falling back to HuggingFace embeddings.")
         if not cls.TAVILY_API_KEY:
             raise ValueError("TAVILY_API_KEY environment variable is required")
         return True
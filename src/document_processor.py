@@ -3,7 +3,9 @@ Document processing utilities for loading and splitting documents.
 """
 
 import os
-from typing import List
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
 from langchain_core.documents import Document
 from langchain_community.document_loaders import CSVLoader, TextLoader, DirectoryLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
@@ -11,41 +13,80 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from .config import Config
 
 
+@lru_cache(maxsize=Config.LOADER_CACHE_SIZE)
+def _load_and_split(kind: str, path: str, signature: tuple, chunk_size: int, chunk_overlap: int,
+                    glob_pattern: Optional[str] = None) -> Tuple[Document, ...]:
+    """Load and split a source; cached on its stat signature, so edits invalidate the entry."""
+    if kind == "csv":
+        loader = CSVLoader(path)
+    elif kind == "text":
+        loader = TextLoader(path)
+    else:
+        loader = DirectoryLoader(path, glob=glob_pattern)
+    
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return tuple(splitter.split_documents(loader.load()))
+
+
+def _file_signature(path: str) -> tuple:
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _directory_signature(path: str, glob_pattern: str) -> tuple:
+    return tuple(sorted(
+        (str(p), *_file_signature(p)) for p in Path(path).glob(glob_pattern) if p.is_file()
+    ))
+
+
 class DocumentProcessor:
     """Handles document loading and processing."""
     
     def __init__(self, chunk_size: int = Config.CHUNK_SIZE, chunk_overlap: int = Config.CHUNK_OVERLAP):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap
         )
     
+    def _cached(self, kind: str, path: str, signature: tuple, glob_pattern: Optional[str] = None) -> List[Document]:
+        docs = _load_and_split(kind, path, signature, self.chunk_size, self.chunk_overlap, glob_pattern)
+        # Hand out copies so callers can't mutate the cached documents
+        return [Document(page_content=doc.page_content, metadata=dict(doc.metadata)) for doc in docs]
+    
     def load_csv(self, file_path: str) -> List[Document]:
-        """Load documents from a CSV file."""
+        """Load documents from a CSV file; unchanged files are served from an in-memory cache."""
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"CSV file not found: {file_path}")
+        
+        return self._cached("csv", file_path, _file_signature(file_path))
+    
+    def iter_csv(self, file_path: str) -> Iterator[Document]:
+        """Stream split chunks from a CSV file without materializing every row first."""
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"CSV file not found: {file_path}")
         
-        loader = CSVLoader(file_path)
-        documents = loader.load()
-        return self.text_splitter.split_documents(documents)
+        return self._split_stream(CSVLoader(file_path).lazy_load())
+    
+    def _split_stream(self, documents: Iterator[Document]) -> Iterator[Document]:
+        for doc in documents:
+            yield from self.text_splitter.split_documents([doc])
     
     def load_text_file(self, file_path: str) -> List[Document]:
         """Load documents from a text file."""
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Text file not found: {file_path}")
         
-        loader = TextLoader(file_path)
-        documents = loader.load()
-        return self.text_splitter.split_documents(documents)
+        return self._cached("text", file_path, _file_signature(file_path))
     
     def load_directory(self, directory_path: str, glob_pattern: str = "**/*.txt") -> List[Document]:
         """Load documents from a directory."""
         if not os.path.exists(directory_path):
             raise FileNotFoundError(f"Directory not found: {directory_path}")
         
-        loader = DirectoryLoader(directory_path, glob=glob_pattern)
-        documents = loader.load()
-        return self.text_splitter.split_documents(documents)
+        signature = _directory_signature(directory_path, glob_pattern)
+        return self._cached("directory", directory_path, signature, glob_pattern)
     
     def create_sample_data(self, output_path: str = "./data/sample_context.csv") -> str:
         """Create sample data for testing."""
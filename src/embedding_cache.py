@@ -0,0 +1,131 @@
+"""
+Persistent embedding cache so unchanged chunks are not re-embedded on every run.
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .config import Config
+
+
+class DiskEmbeddingCache:
+    """Stores one .npy vector per SHA-256 content hash under a cache directory."""
+
+    def __init__(self, path: str = Config.EMBEDDING_CACHE_PATH,
+                 max_entries: int = Config.EMBEDDING_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+
+    def _file_for(self, key: str) -> str:
+        # Shard by hash prefix to keep directories small
+        return os.path.join(self.path, key[:2], f"{key}.npy")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return the cached vector for a key, or None if it is not cached."""
+        path = self._file_for(key)
+        try:
+            vector = np.load(path)
+            # The mtime records the last use, which is what prune() evicts by
+            os.utime(path)
+            return vector
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+
+    def put(self, key: str, vector: np.ndarray) -> None:
+        """Write a vector atomically so concurrent readers never see a partial file."""
+        target = self._file_for(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.asarray(vector, dtype=np.float32))
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def prune(self) -> int:
+        """Delete the least recently used vectors beyond max_entries, returning how many were removed."""
+        try:
+            shards = [entry.path for entry in os.scandir(self.path) if entry.is_dir()]
+        except FileNotFoundError:
+            return 0
+        files = []
+        for shard in shards:
+            with os.scandir(shard) as entries:
+                files.extend(
+                    (entry.stat().st_mtime, entry.path) for entry in entries if entry.name.endswith(".npy")
+                )
+        excess = len(files) - self.max_entries
+        if excess <= 0:
+            return 0
+        files.sort()
+        for _, path in files[:excess]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return excess
+
+
+def _default_namespace(embeddings: Embeddings) -> str:
+    """Model name plus any backend, ONNX file or dtype that changes the vectors it produces."""
+    parts = [
+        getattr(embeddings, "model_name", None)
+        or getattr(embeddings, "model", None)
+        or Config.EMBEDDING_MODEL
+    ]
+    model_kwargs = getattr(embeddings, "model_kwargs", None) or {}
+    backend = model_kwargs.get("backend")
+    if backend and backend != "torch":
+        parts.append(str(backend))
+    backend_kwargs = model_kwargs.get("model_kwargs") or {}
+    for name in ("file_name", "torch_dtype"):
+        if backend_kwargs.get(name) is not None:
+            parts.append(str(backend_kwargs[name]))
+    return "|".join(parts)
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings proxy that only calls the wrapped model for texts missing from the cache."""
+
+    def __init__(self, embeddings: Embeddings, cache: Optional[DiskEmbeddingCache] = None,
+                 namespace: Optional[str] = None):
+        self.embeddings = embeddings
+        self.cache = cache or DiskEmbeddingCache()
+        # Prefix keys with the model variant so switching models invalidates old vectors
+        self.namespace = namespace or _default_namespace(embeddings)
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, reusing cached vectors for previously seen texts."""
+        keys = [self._key(text) for text in texts]
+        vectors: List[Optional[np.ndarray]] = [self.cache.get(key) for key in keys]
+
+        # Embed each distinct missing text once
+        missing = {}
+        for text, key, vector in zip(texts, keys, vectors):
+            if vector is None and key not in missing:
+                missing[key] = text
+
+        if missing:
+            fresh = self.embeddings.embed_documents(list(missing.values()))
+            computed = {}
+            for key, vector in zip(missing, fresh):
+                computed[key] = np.asarray(vector, dtype=np.float32)
+                self.cache.put(key, computed[key])
+            vectors = [computed[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+
+        return [vector.tolist() for vector in vectors]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query; queries are not persisted."""
+        return self.embeddings.embed_query(text)
@@ -3,17 +3,50 @@ Simple built-in evaluation system for Adaptive RAG.
 No external dependencies required.
 """
 
+import csv
+import re
+import threading
 import time
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
+
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.documents import Document
 
 from .adaptive_rag import AdaptiveRAG
+from .cache import CacheProbe, SemanticCache
+from .config import Config
+
+# Phrases that suggest the answer refers back to its sources, matched in one case-insensitive pass
+_CITATION_RE = re.compile(r"according to|based on|the document|the context|as mentioned", re.IGNORECASE)
+
+_CSV_FIELDS = [
+    "question", "answer", "route_taken", "response_time",
+    "document_count", "answer_length", "contains_citations", "context_preview",
+]
 
 
-@dataclass
+class _RunTimer(BaseCallbackHandler):
+    """Measures the wall time of the outermost run it is attached to."""
+    
+    def __init__(self):
+        self.started: Optional[float] = None
+        self.elapsed: float = 0.0
+    
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        if parent_run_id is None:
+            self.started = time.perf_counter()
+    
+    def on_chain_end(self, outputs, *, run_id, parent_run_id=None, **kwargs):
+        if parent_run_id is None and self.started is not None:
+            self.elapsed = time.perf_counter() - self.started
+
+
+@dataclass(slots=True, frozen=True)
 class EvaluationMetrics:
-    """Simple evaluation metrics."""
+    """Simple evaluation metrics (immutable and hashable, with no per-instance __dict__)."""
     question: str
     answer: str
     context_used: str
@@ -27,50 +60,92 @@ class EvaluationMetrics:
 class SimpleEvaluator:
     """Simple evaluation system for RAG responses."""
     
-    def __init__(self, rag_system: AdaptiveRAG):
+    def __init__(self, rag_system: AdaptiveRAG, use_cache: bool = Config.ENABLE_ANSWER_CACHE):
         self.rag_system = rag_system
         self.evaluation_results: List[EvaluationMetrics] = []
+        self._results_lock = threading.Lock()
+        
+        # Repeated or paraphrased questions reuse the earlier route and graph output
+        self._response_cache = (
+            SemanticCache(rag_system.retriever.embeddings, threshold=Config.CACHE_SIM_THRESHOLD)
+            if use_cache else None
+        )
+        if self._response_cache is not None:
+            # Rebuilding or reloading the vectorstore invalidates cached graph outputs too
+            rag_system.register_cache(self._response_cache)
     
-    def evaluate_response(self, question: str) -> EvaluationMetrics:
-        """Evaluate a single response."""
+    def evaluate_response(self, question: str,
+                          prefetched_documents: Optional[List[Document]] = None,
+                          route: Optional[str] = None) -> EvaluationMetrics:
+        """Evaluate a single response, optionally reusing a route and documents fetched ahead of time.
+        
+        prefetched_documents must come with the route they were fetched for.
+        """
+        metrics = self._evaluate(question, prefetched_documents, route)
+        self._store([metrics])
+        return metrics
+    
+    def _evaluate(self, question: str, prefetched_documents: Optional[List[Document]],
+                  route: Optional[str], probe: Optional[CacheProbe] = None,
+                  prefetch_time: float = 0.0) -> EvaluationMetrics:
+        """Run (or fetch from cache) one question and build its metrics without storing them.
+        
+        A probe means the caller already missed the cache, so the question isn't embedded again;
+        prefetch_time is the question's share of batched routing and retrieval done beforehand.
+        """
+        if prefetched_documents is not None and route is None:
+            raise ValueError("prefetched_documents requires the route they were fetched for")
         print(f"📝 Evaluating: {question}")
         
-        start_time = time.time()
+        # perf_counter is monotonic, so latencies stay per-call when questions run concurrently
+        start_time = time.perf_counter()
         
-        # Track the routing decision
-        route_taken = self.rag_system.question_router.route(question)
+        if probe is not None or self._response_cache is None:
+            cached = None
+        else:
+            cached, probe = self._response_cache.lookup(question)
         
-        # Get the full response
-        inputs = {"question": question}
-        result = self.rag_system.app.invoke(inputs)
+        if cached is not None:
+            result = cached
+        else:
+            # A precomputed route is passed through; otherwise the graph routes once and records it
+            inputs = {"question": question}
+            if route is not None:
+                inputs["route"] = route
+            if prefetched_documents is not None:
+                inputs["prefetched_documents"] = tuple(prefetched_documents)
+            result = self.rag_system.app.invoke(inputs)
+            
+            if probe is not None and AdaptiveRAG.should_cache(result):
+                self._response_cache.store(probe, result)
         
-        end_time = time.time()
-        response_time = end_time - start_time
+        response_time = time.perf_counter() - start_time + prefetch_time
+        return self._metrics(question, result, route, response_time)
+    
+    def _metrics(self, question: str, result: Dict[str, Any], route: Optional[str],
+                 response_time: float) -> EvaluationMetrics:
+        """Turn a final graph state into EvaluationMetrics."""
+        route_taken = result.get("route") or route or ""
         
         # Extract information
         answer = result.get("generation", "")
-        documents = result.get("documents", [])
+        documents = result.get("documents") or ()
         
         # Calculate metrics
-        context_used = ""
-        document_count = 0
-        
-        if documents:
-            if isinstance(documents, list):
-                context_used = "\n".join([
-                    doc.page_content if hasattr(doc, 'page_content') else str(doc) 
-                    for doc in documents
-                ])
-                document_count = len(documents)
-            else:
-                context_used = documents.page_content if hasattr(documents, 'page_content') else str(documents)
-                document_count = 1
+        if isinstance(documents, Document):
+            documents = (documents,)
+        document_count = len(documents)
+        
+        # The generate node already formatted (and capped) the context it used; don't rebuild it
+        context_used = result.get("docs_text")
+        if context_used is None:
+            if documents and type(documents[0]) is not Document:
+                documents = [Document(page_content=str(doc)) for doc in documents]
+            context_used = self.rag_system.rag_chain.format_docs(documents)
         
         # Simple heuristics
         answer_length = len(answer.split()) if answer else 0
-        contains_citations = any(phrase in answer.lower() for phrase in [
-            "according to", "based on", "the document", "the context", "as mentioned"
-        ])
+        contains_citations = _CITATION_RE.search(answer) is not None
         
         metrics = EvaluationMetrics(
             question=question,
@@ -82,39 +157,163 @@ class SimpleEvaluator:
             answer_length=answer_length,
             contains_citations=contains_citations
         )
-        
-        self.evaluation_results.append(metrics)
         return metrics
     
+    def _store(self, metrics: List[Optional[EvaluationMetrics]]) -> List[EvaluationMetrics]:
+        """Append successful metrics to evaluation_results in the order given, i.e. input order."""
+        results = [m for m in metrics if m is not None]
+        with self._results_lock:
+            self.evaluation_results.extend(results)
+        return results
+    
     def evaluate_batch(self, questions: List[str]) -> List[EvaluationMetrics]:
-        """Evaluate multiple questions."""
-        results = []
-        for question in questions:
-            try:
-                result = self.evaluate_response(question)
-                results.append(result)
-            except Exception as e:
-                print(f"❌ Error evaluating '{question}': {e}")
+        """Evaluate multiple questions, routing and fetching context for the uncached ones up front."""
+        results: List[Optional[EvaluationMetrics]] = [None] * len(questions)
+        misses = []
+        probes = {}
+        for i, question in enumerate(questions):
+            start_time = time.perf_counter()
+            if self._response_cache is not None:
+                cached, probes[i] = self._response_cache.lookup(question)
+            else:
+                cached = None
+            if cached is not None:
+                print(f"📝 Evaluating: {question}")
+                results[i] = self._metrics(question, cached, None, time.perf_counter() - start_time)
+            else:
+                misses.append(i)
         
-        return results
+        # Repeated questions share one routing decision and one fetch
+        distinct = list(dict.fromkeys(questions[i] for i in misses))
+        start_time = time.perf_counter()
+        routes = dict(zip(distinct, self.rag_system.question_router.route_many(distinct)))
+        # Each question is charged an even share of every batched step it took part in
+        prefetch_times = dict.fromkeys(distinct, (time.perf_counter() - start_time) / max(1, len(distinct)))
+        
+        # Web searches are independent network calls, so run them all at once
+        web_questions = [q for q in distinct if routes[q] == "web_search"]
+        start_time = time.perf_counter()
+        web_documents = dict(zip(web_questions, self.rag_system.web_searcher.search_many(web_questions)))
+        for question in web_questions:
+            prefetch_times[question] += (time.perf_counter() - start_time) / len(web_questions)
+        
+        # Vectorstore questions share one embedding call and one FAISS search
+        vector_questions = [q for q in distinct if routes[q] == "vectorstore"]
+        start_time = time.perf_counter()
+        try:
+            vector_documents = dict(zip(vector_questions, self.rag_system.retriever.retrieve_many(vector_questions)))
+        except Exception:
+            # Let the graph retrieve (and report any error) itself
+            vector_documents = {}
+        for question in vector_questions:
+            prefetch_times[question] += (time.perf_counter() - start_time) / len(vector_questions)
+        
+        miss_questions = [questions[i] for i in misses]
+        prefetched = [
+            [web_documents[question]] if routes[question] == "web_search" else vector_documents.get(question)
+            for question in miss_questions
+        ]
+        with ThreadPoolExecutor(max_workers=max(1, Config.EVAL_CONCURRENCY)) as executor:
+            evaluated = executor.map(
+                self._evaluate_safely,
+                miss_questions,
+                prefetched,
+                [routes[q] for q in miss_questions],
+                [probes.get(i) for i in misses],
+                [prefetch_times[q] for q in miss_questions],
+            )
+            for i, metrics in zip(misses, evaluated):
+                results[i] = metrics
+        
+        return self._store(results)
+    
+    def evaluate_batch_concurrent(self, questions: List[str],
+                                  max_workers: int = Config.EVAL_CONCURRENCY) -> List[EvaluationMetrics]:
+        """Evaluate independent questions in parallel without batched prefetching."""
+        return self._evaluate_all(questions, [None] * len(questions), [None] * len(questions), max_workers)
+    
+    def evaluate_batch_parallel(self, questions: List[str]) -> List[EvaluationMetrics]:
+        """Evaluate questions with one LangGraph batch call so nodes overlap across questions."""
+        results: List[Optional[EvaluationMetrics]] = [None] * len(questions)
+        pending = []
+        for i, question in enumerate(questions):
+            print(f"📝 Evaluating: {question}")
+            start_time = time.perf_counter()
+            if self._response_cache is not None:
+                cached, probe = self._response_cache.lookup(question)
+            else:
+                cached, probe = None, None
+            if cached is not None:
+                results[i] = self._metrics(question, cached, None, time.perf_counter() - start_time)
+            else:
+                pending.append((i, question, probe))
+        
+        if pending:
+            # One timer per question, so each latency covers only its own graph run
+            timers = [_RunTimer() for _ in pending]
+            outputs = self.rag_system.app.batch(
+                [{"question": question} for _, question, _ in pending],
+                config=[
+                    {"max_concurrency": Config.EVAL_CONCURRENCY, "callbacks": [timer]} for timer in timers
+                ],
+                return_exceptions=True,
+            )
+            for (i, question, probe), timer, output in zip(pending, timers, outputs):
+                if isinstance(output, Exception):
+                    print(f"❌ Error evaluating '{question}': {output}")
+                    continue
+                if probe is not None and AdaptiveRAG.should_cache(output):
+                    self._response_cache.store(probe, output)
+                results[i] = self._metrics(question, output, None, timer.elapsed)
+        
+        return self._store(results)
+    
+    def _evaluate_all(self, questions: List[str], prefetched: List[Optional[List[Document]]],
+                      routes: List[Optional[str]], max_workers: int) -> List[EvaluationMetrics]:
+        """Evaluate questions on a thread pool, returning successful results in input order."""
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            results = list(executor.map(self._evaluate_safely, questions, prefetched, routes))
+        return self._store(results)
+    
+    def _evaluate_safely(self, question: str, prefetched_documents: Optional[List[Document]] = None,
+                         route: Optional[str] = None, probe: Optional[CacheProbe] = None,
+                         prefetch_time: float = 0.0) -> Optional[EvaluationMetrics]:
+        """Evaluate one question, reporting errors instead of aborting the batch."""
+        try:
+            return self._evaluate(question, prefetched_documents, route, probe, prefetch_time)
+        except Exception as e:
+            print(f"❌ Error evaluating '{question}': {e}")
+            return None
+    
+    def clear_cache(self) -> None:
+        """Forget cached responses, e.g. after the vectorstore changes."""
+        if self._response_cache is not None:
+            self._response_cache.clear()
     
     def generate_report(self) -> Dict[str, Any]:
         """Generate a simple evaluation report."""
         if not self.evaluation_results:
             return {"error": "No evaluation results available"}
         
-        # Calculate basic statistics
-        total_questions = len(self.evaluation_results)
-        avg_response_time = sum(r.response_time for r in self.evaluation_results) / total_questions
-        avg_answer_length = sum(r.answer_length for r in self.evaluation_results) / total_questions
-        avg_document_count = sum(r.document_count for r in self.evaluation_results) / total_questions
+        # Pull each numeric field into an array once; every statistic below is a vectorized reduction
+        results = list(self.evaluation_results)
+        total_questions = len(results)
+        response_times = np.fromiter((r.response_time for r in results), dtype=np.float64, count=total_questions)
+        answer_lengths = np.fromiter((r.answer_length for r in results), dtype=np.int64, count=total_questions)
+        document_counts = np.fromiter((r.document_count for r in results), dtype=np.int64, count=total_questions)
+        routes = np.array([r.route_taken for r in results])
+        citations = np.fromiter((r.contains_citations for r in results), dtype=bool, count=total_questions)
+        
+        avg_response_time = float(response_times.mean())
+        avg_answer_length = float(answer_lengths.mean())
+        avg_document_count = float(document_counts.mean())
         
         # Route distribution
-        vectorstore_count = sum(1 for r in self.evaluation_results if r.route_taken == "vectorstore")
-        web_search_count = sum(1 for r in self.evaluation_results if r.route_taken == "web_search")
+        vectorstore_count = int(np.count_nonzero(routes == "vectorstore"))
+        web_search_count = int(np.count_nonzero(routes == "web_search"))
         
         # Citation analysis
-        citations_count = sum(1 for r in self.evaluation_results if r.contains_citations)
+        citations_count = int(np.count_nonzero(citations))
         
         report = {
             "summary": {
@@ -132,13 +331,13 @@ class SimpleEvaluator:
             "quality_indicators": {
                 "responses_with_citations": citations_count,
                 "citation_percentage": round((citations_count / total_questions) * 100, 1),
-                "responses_with_context": sum(1 for r in self.evaluation_results if r.document_count > 0),
+                "responses_with_context": int(np.count_nonzero(document_counts > 0)),
             },
             "performance": {
-                "fastest_response": round(min(r.response_time for r in self.evaluation_results), 2),
-                "slowest_response": round(max(r.response_time for r in self.evaluation_results), 2),
-                "longest_answer": max(r.answer_length for r in self.evaluation_results),
-                "shortest_answer": min(r.answer_length for r in self.evaluation_results),
+                "fastest_response": round(float(response_times.min()), 2),
+                "slowest_response": round(float(response_times.max()), 2),
+                "longest_answer": int(answer_lengths.max()),
+                "shortest_answer": int(answer_lengths.min()),
             }
         }
         
@@ -197,25 +396,35 @@ class SimpleEvaluator:
             print(f"   Has Citations: {'Yes' if result.contains_citations else 'No'}")
             print(f"   Answer: {result.answer[:100]}{'...' if len(result.answer) > 100 else ''}")
     
-    def save_results_to_csv(self, filename: str = "./data/evaluation_results.csv"):
-        """Save evaluation results to CSV."""
-        import pandas as pd
-        
-        data = []
-        for result in self.evaluation_results:
-            data.append({
-                "question": result.question,
-                "answer": result.answer,
-                "route_taken": result.route_taken,
-                "response_time": result.response_time,
-                "document_count": result.document_count,
-                "answer_length": result.answer_length,
-                "contains_citations": result.contains_citations,
-                "context_preview": result.context_used[:200] + "..." if len(result.context_used) > 200 else result.context_used
-            })
-        
-        df = pd.DataFrame(data)
-        df.to_csv(filename, index=False)
+    def save_results_to_csv(self, filename: str = "./data/evaluation_results.csv", as_dataframe: bool = False):
+        """Save evaluation results to CSV, streaming rows straight to disk.
+        
+        Pass as_dataframe=True to also get the results back as a pandas DataFrame.
+        """
+        with self._results_lock:
+            results = list(self.evaluation_results)
+        
+        with open(filename, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=_CSV_FIELDS)
+            writer.writeheader()
+            writer.writerows(self._csv_row(result) for result in results)
         print(f"💾 Results saved to {filename}")
         
-        return df
+        if as_dataframe:
+            import pandas as pd
+            return pd.DataFrame([self._csv_row(result) for result in results], columns=_CSV_FIELDS)
+        return None
+    
+    @staticmethod
+    def _csv_row(result: EvaluationMetrics) -> Dict[str, Any]:
+        context = result.context_used
+        return {
+            "question": result.question,
+            "answer": result.answer,
+            "route_taken": result.route_taken,
+            "response_time": result.response_time,
+            "document_count": result.document_count,
+            "answer_length": result.answer_length,
+            "contains_citations": result.contains_citations,
+            "context_preview": context[:200] + "..." if len(context) > 200 else context,
+        }
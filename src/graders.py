@@ -2,82 +2,192 @@
 Grading components for evaluating documents, answers, and hallucinations.
 """
 
+from typing import List, Optional
+
+from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
 
-from .models import GradeDocuments, GradeHallucinations, GradeAnswer
+from .models import GradeDocuments, GradeDocumentsBatch, GradeHallucinations, GradeAnswer
 from .config import Config
+from .llm import get_chat_model
+
+# Prompts are immutable, so they are parsed once and shared by every grader instance
+_DOC_GRADE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a grader assessing relevance of a retrieved document to a user question.
+
+If the document contains keyword(s) or semantic meaning related to the question, grade it as relevant.
+
+Give a binary score 'yes' or 'no' score to indicate whether the document is relevant to the question."""),
+    ("human", "Retrieved document: \n\n {document} \n\n User question: {question}"),
+])
+
+_DOC_BATCH_GRADE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a grader assessing relevance of retrieved documents to a user question.
+
+For each numbered document, grade it as relevant if it contains keyword(s) or semantic meaning related to the question.
+
+Return one binary score 'yes' or 'no' per document, in the same order as the documents."""),
+    ("human", "Retrieved documents: \n\n {documents} \n\n User question: {question}"),
+])
+
+_HALLUCINATION_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a grader assessing whether an LLM generation is grounded in / supported by a set of retrieved facts.
+
+Give a binary score 'yes' or 'no'. 'Yes' means that the answer is grounded in / supported by the set of facts."""),
+    ("human", "Set of facts: \n\n {documents} \n\n LLM generation: {generation}"),
+])
+
+_ANSWER_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a grader assessing whether an answer addresses / resolves a question
+
+Give a binary score 'yes' or 'no'. 'Yes' means that the answer resolves the question."""),
+    ("human", "User question: \n\n {question} \n\n LLM generation: {generation}"),
+])
 
 
 class DocumentGrader:
     """Grades documents for relevance to a question."""
     
-    def __init__(self, model_name: str = Config.DEFAULT_MODEL):
-        self.llm = ChatGroq(model=model_name, temperature=Config.TEMPERATURE)
+    def __init__(self, model_name: str = Config.DEFAULT_MODEL, llm: Optional[BaseChatModel] = None):
+        self.llm = llm or get_chat_model(model_name, use_prompt_cache=True)
         self.structured_llm = self.llm.with_structured_output(GradeDocuments)
         
-        system_prompt = """You are a grader assessing relevance of a retrieved document to a user question.
-        
-        If the document contains keyword(s) or semantic meaning related to the question, grade it as relevant.
-        
-        Give a binary score 'yes' or 'no' score to indicate whether the document is relevant to the question."""
-        
-        self.grade_prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", "Retrieved document: \n\n {document} \n\n User question: {question}"),
-        ])
-        
+        self.grade_prompt = _DOC_GRADE_PROMPT
         self.grader = self.grade_prompt | self.structured_llm
+        
+        # Single-call variant that grades every retrieved document at once
+        self.batch_grade_prompt = _DOC_BATCH_GRADE_PROMPT
+        self.batch_grader = self.batch_grade_prompt | self.llm.with_structured_output(GradeDocumentsBatch)
     
     def grade(self, question: str, document: str) -> str:
         """Grade a document for relevance to a question."""
         result = self.grader.invoke({"question": question, "document": document})
         return result.binary_score
+    
+    def grade_concurrent(self, question: str, documents: List[str]) -> List[str]:
+        """Grade several documents concurrently, returning scores in input order."""
+        if not documents:
+            return []
+        
+        results = self.grader.batch(
+            [{"question": question, "document": document} for document in documents],
+            config={"max_concurrency": Config.GRADER_CONCURRENCY},
+        )
+        return [result.binary_score for result in results]
+    
+    async def agrade(self, question: str, document: str) -> str:
+        """Async version of grade()."""
+        result = await self.grader.ainvoke({"question": question, "document": document})
+        return result.binary_score
+    
+    async def agrade_concurrent(self, question: str, documents: List[str]) -> List[str]:
+        """Async version of grade_concurrent()."""
+        if not documents:
+            return []
+        
+        results = await self.grader.abatch(
+            [{"question": question, "document": document} for document in documents],
+            config={"max_concurrency": Config.GRADER_CONCURRENCY},
+        )
+        return [result.binary_score for result in results]
+    
+    def grade_batch(self, question: str, documents: List[str]) -> List[str]:
+        """Grade documents with one LLM call per GRADER_BATCH_SIZE chunk, falling back to per-document grading."""
+        if len(documents) <= 1:
+            return self.grade_concurrent(question, documents)
+        
+        chunks = self._chunk(documents)
+        results = self.batch_grader.batch(
+            [{"question": question, "documents": self._number_documents(chunk)} for chunk in chunks],
+            config={"max_concurrency": Config.GRADER_CONCURRENCY},
+            return_exceptions=True,
+        )
+        
+        scores = []
+        for chunk, result in zip(chunks, results):
+            chunk_scores = self._parse_batch_scores(result, len(chunk))
+            if chunk_scores is None:
+                # The model returned unusable output; grade this chunk's documents on their own
+                chunk_scores = self.grade_concurrent(question, chunk)
+            scores.extend(chunk_scores)
+        return scores
+    
+    async def agrade_batch(self, question: str, documents: List[str]) -> List[str]:
+        """Async version of grade_batch()."""
+        if len(documents) <= 1:
+            return await self.agrade_concurrent(question, documents)
+        
+        chunks = self._chunk(documents)
+        results = await self.batch_grader.abatch(
+            [{"question": question, "documents": self._number_documents(chunk)} for chunk in chunks],
+            config={"max_concurrency": Config.GRADER_CONCURRENCY},
+            return_exceptions=True,
+        )
+        
+        scores = []
+        for chunk, result in zip(chunks, results):
+            chunk_scores = self._parse_batch_scores(result, len(chunk))
+            if chunk_scores is None:
+                chunk_scores = await self.agrade_concurrent(question, chunk)
+            scores.extend(chunk_scores)
+        return scores
+    
+    @staticmethod
+    def _chunk(documents: List[str]) -> List[List[str]]:
+        size = max(1, Config.GRADER_BATCH_SIZE)
+        return [documents[i:i + size] for i in range(0, len(documents), size)]
+    
+    @staticmethod
+    def _number_documents(documents: List[str]) -> str:
+        return "\n\n".join(f"Document {i}:\n{document}" for i, document in enumerate(documents, 1))
+    
+    @staticmethod
+    def _parse_batch_scores(result: object, expected: int) -> Optional[List[str]]:
+        if not isinstance(result, GradeDocumentsBatch):
+            return None
+        scores = list(result.binary_scores)
+        return scores if len(scores) == expected else None
 
 
 class HallucinationGrader:
     """Grades whether an answer is grounded in facts."""
     
-    def __init__(self, model_name: str = Config.DEFAULT_MODEL):
-        self.llm = ChatGroq(model=model_name, temperature=Config.TEMPERATURE)
+    def __init__(self, model_name: str = Config.DEFAULT_MODEL, llm: Optional[BaseChatModel] = None):
+        # Not prompt-cached: a "not supported" verdict sends the graph back to generate, and a
+        # replayed verdict for an identical regeneration would loop until the recursion limit
+        self.llm = llm or get_chat_model(model_name)
         self.structured_llm = self.llm.with_structured_output(GradeHallucinations)
         
-        system_prompt = """You are a grader assessing whether an LLM generation is grounded in / supported by a set of retrieved facts.
-        
-        Give a binary score 'yes' or 'no'. 'Yes' means that the answer is grounded in / supported by the set of facts."""
-        
-        self.grade_prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", "Set of facts: \n\n {documents} \n\n LLM generation: {generation}"),
-        ])
-        
+        self.grade_prompt = _HALLUCINATION_PROMPT
         self.grader = self.grade_prompt | self.structured_llm
     
     def grade(self, documents: str, generation: str) -> str:
         """Grade whether a generation is grounded in documents."""
         result = self.grader.invoke({"documents": documents, "generation": generation})
         return result.binary_score
+    
+    async def agrade(self, documents: str, generation: str) -> str:
+        """Async version of grade()."""
+        result = await self.grader.ainvoke({"documents": documents, "generation": generation})
+        return result.binary_score
 
 
 class AnswerGrader:
     """Grades whether an answer addresses the question."""
     
-    def __init__(self, model_name: str = Config.DEFAULT_MODEL):
-        self.llm = ChatGroq(model=model_name, temperature=Config.TEMPERATURE)
+    def __init__(self, model_name: str = Config.DEFAULT_MODEL, llm: Optional[BaseChatModel] = None):
+        self.llm = llm or get_chat_model(model_name, use_prompt_cache=True)
         self.structured_llm = self.llm.with_structured_output(GradeAnswer)
         
-        system_prompt = """You are a grader assessing whether an answer addresses / resolves a question
-        
-        Give a binary score 'yes' or 'no'. 'Yes' means that the answer resolves the question."""
-        
-        self.grade_prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", "User question: \n\n {question} \n\n LLM generation: {generation}"),
-        ])
-        
+        self.grade_prompt = _ANSWER_PROMPT
         self.grader = self.grade_prompt | self.structured_llm
     
     def grade(self, question: str, generation: str) -> str:
         """Grade whether a generation addresses the question."""
         result = self.grader.invoke({"question": question, "generation": generation})
         return result.binary_score
+    
+    async def agrade(self, question: str, generation: str) -> str:
+        """Async version of grade()."""
+        result = await self.grader.ainvoke({"question": question, "generation": generation})
+        return result.binary_score
@@ -2,35 +2,180 @@
 Alternative embedding providers for when OpenAI is not available.
 """
 
-from typing import List
+import json
+import math
+import os
+import shutil
+import tempfile
+import warnings
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
 from langchain_core.documents import Document
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 
 from .config import Config
+from .embedding_cache import CachedEmbeddings
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.jsonl"
+CURRENT_FILE = "CURRENT"  # Names the generation directory holding the live index + docstore
+
+
+def _select_device() -> str:
+    """Resolve Config.EMBEDDING_DEVICE, preferring CUDA, then Apple MPS, then CPU for "auto"."""
+    if Config.EMBEDDING_DEVICE != "auto":
+        return Config.EMBEDDING_DEVICE
+    try:
+        import torch
+    except ImportError:
+        return "cpu"
+    if torch.cuda.is_available():
+        return "cuda"
+    mps = getattr(torch.backends, "mps", None)
+    if mps is not None and mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def _hf_model_kwargs(device: str) -> Dict[str, Any]:
+    """SentenceTransformer constructor arguments for the configured device and backend."""
+    kwargs: Dict[str, Any] = {"device": device}
+    if Config.EMBEDDING_BACKEND == "onnx":
+        # Quantized ONNX export of the same model, for fast CPU inference
+        kwargs["backend"] = "onnx"
+        if Config.EMBEDDING_ONNX_FILE:
+            kwargs["model_kwargs"] = {"file_name": Config.EMBEDDING_ONNX_FILE}
+    elif device == "cuda" and Config.EMBEDDING_FP16:
+        import torch
+        kwargs["model_kwargs"] = {"torch_dtype": torch.float16}
+    return kwargs
 
 
 class AlternativeEmbeddings:
     """Alternative embedding providers."""
     
     @staticmethod
+    @lru_cache(maxsize=1)
     def get_embeddings():
-        """Get the best available embedding model."""
+        """Get the configured embedding model (local HuggingFace unless OpenAI is opted into).
+        
+        The model is loaded once per process and shared by every caller.
+        """
         try:
-            # Try OpenAI first if available
-            if Config.OPENAI_API_KEY:
+            # OpenAI is opt-in via EMBEDDING_PROVIDER=openai
+            if Config.EMBEDDING_PROVIDER == "openai" and Config.OPENAI_API_KEY:
                 from langchain_openai import OpenAIEmbeddings
-                return OpenAIEmbeddings(model=Config.EMBEDDING_MODEL)
+                return OpenAIEmbeddings(
+                    model=Config.OPENAI_EMBEDDING_MODEL, chunk_size=Config.OPENAI_EMBED_CHUNK_SIZE
+                )
         except ImportError:
             pass
         
-        # Fallback to HuggingFace embeddings (free, local)
-        print("🔄 Using HuggingFace embeddings (local, free)")
+        # HuggingFace embeddings (free, local); sentence-transformers is only imported when used
+        from langchain_huggingface import HuggingFaceEmbeddings
+        
+        model_kwargs = _hf_model_kwargs(_select_device())
+        print(f"🔄 Using HuggingFace embeddings (local, free) on {model_kwargs['device']}")
         return HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
+            model_name=Config.EMBEDDING_MODEL,
+            model_kwargs=model_kwargs,
+            encode_kwargs={'normalize_embeddings': True, 'batch_size': Config.EMBED_BATCH_SIZE}
+        )
+
+
+def build_index(vectors: np.ndarray) -> Any:
+    """Choose an inner-product FAISS index suited to the corpus size, training it if needed."""
+    num_vectors, dim = vectors.shape
+    
+    if Config.USE_PQ and num_vectors > Config.PQ_MIN_DOCS:
+        # Product quantization compresses each vector to a few dozen bytes
+        quantizer = faiss.IndexFlatIP(dim)
+        nlist = int(4 * math.sqrt(num_vectors))
+        index = faiss.IndexIVFPQ(
+            quantizer, dim, nlist, _pq_subquantizers(dim), Config.PQ_NBITS, faiss.METRIC_INNER_PRODUCT
         )
+        index.train(vectors)
+        return tune_index(index)
+    
+    if num_vectors < Config.HNSW_MIN_DOCS:
+        # Exact search beats graph traversal on small corpora
+        return faiss.IndexFlatIP(dim)
+    
+    index = faiss.IndexHNSWFlat(dim, Config.HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    index.hnsw.efConstruction = Config.HNSW_EF_CONSTRUCTION
+    return tune_index(index)
+
+
+def _pq_subquantizers(dim: int) -> int:
+    """Largest number of PQ sub-vectors, at most dim // 4, that evenly divides dim."""
+    for m in range(max(dim // 4, 1), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def _read_index(path: str) -> Any:
+    """Read a FAISS index, memory-mapped and read-only when the index type allows it."""
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        return faiss.read_index(path)
+
+
+def _read_docstore(path: str) -> Tuple[Dict[str, Document], Dict[int, str]]:
+    """Stream documents from a docstore.jsonl file, one document per index position."""
+    documents: Dict[str, Document] = {}
+    index_to_docstore_id: Dict[int, str] = {}
+    with open(path, encoding="utf-8") as f:
+        for position, line in enumerate(f):
+            record = json.loads(line)
+            documents[record["id"]] = Document(
+                id=record["id"], page_content=record["page_content"], metadata=record["metadata"]
+            )
+            index_to_docstore_id[position] = record["id"]
+    return documents, index_to_docstore_id
+
+
+def tune_index(index: Any) -> Any:
+    """Apply search-time parameters, which are not all restored by faiss.read_index."""
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = Config.HNSW_EF_SEARCH
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = Config.PQ_NPROBE
+    return index
+
+
+def _vectorstore_kwargs() -> Dict[str, Any]:
+    # Unit-length vectors make inner product equal to cosine similarity
+    return {"distance_strategy": DistanceStrategy.MAX_INNER_PRODUCT, "normalize_L2": True}
+
+
+def new_ip_vectorstore(embeddings: Any, index: Any, docstore: Optional[InMemoryDocstore] = None,
+                       index_to_docstore_id: Optional[Dict[int, str]] = None) -> FAISS:
+    """Wrap a FAISS index in a LangChain store that searches by cosine similarity."""
+    with warnings.catch_warnings():
+        # LangChain warns that L2 normalization is unusual for inner product; here it is intended
+        warnings.simplefilter("ignore")
+        return FAISS(
+            embeddings,
+            index,
+            InMemoryDocstore() if docstore is None else docstore,
+            {} if index_to_docstore_id is None else index_to_docstore_id,
+            **_vectorstore_kwargs(),
+        )
+
+
+def load_ip_vectorstore(path: str, embeddings: Any) -> FAISS:
+    """Load a store written by FAISS.save_local, with the same cosine-similarity settings."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True, **_vectorstore_kwargs())
 
 
 class GroqDocumentRetriever:
@@ -39,30 +184,121 @@ class GroqDocumentRetriever:
     def __init__(self, vectorstore_path: str = Config.VECTOR_STORE_PATH):
         self.vectorstore_path = vectorstore_path
         self.embeddings = AlternativeEmbeddings.get_embeddings()
+        if Config.USE_EMBEDDING_CACHE:
+            self.embeddings = CachedEmbeddings(self.embeddings)
         self.vectorstore = None
         self.retriever = None
     
-    def create_vectorstore(self, documents: List[Document]) -> None:
-        """Create a vectorstore from documents."""
-        self.vectorstore = FAISS.from_documents(documents, self.embeddings)
+    def create_vectorstore(self, documents: Iterable[Document]) -> None:
+        """Create a vectorstore from documents, embedding them in mini-batches as they stream in."""
+        texts: List[str] = []
+        metadatas: List[dict] = []
+        batches: List[np.ndarray] = []
+        
+        documents = iter(documents)
+        while True:
+            batch = list(islice(documents, Config.INDEX_BATCH_SIZE))
+            if not batch:
+                break
+            batch_texts = [doc.page_content for doc in batch]
+            batches.append(np.asarray(self.embeddings.embed_documents(batch_texts), dtype=np.float32))
+            texts.extend(batch_texts)
+            metadatas.extend(doc.metadata for doc in batch)
+        
+        if not texts:
+            raise ValueError("Cannot create a vectorstore without documents.")
+        
+        if isinstance(self.embeddings, CachedEmbeddings):
+            # Every chunk of this corpus was just used, so pruning only drops vectors for stale chunks
+            self.embeddings.cache.prune()
+        
+        vectors = np.concatenate(batches) if len(batches) > 1 else batches[0]
+        faiss.normalize_L2(vectors)
+        index = build_index(vectors)
+        
+        self.vectorstore = new_ip_vectorstore(self.embeddings, index)
+        self.vectorstore.add_embeddings(zip(texts, vectors), metadatas=metadatas)
         self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": Config.RETRIEVAL_K})
     
+    def _store_dir(self) -> str:
+        """Directory holding the live index + docstore pair."""
+        try:
+            with open(os.path.join(self.vectorstore_path, CURRENT_FILE), encoding="utf-8") as f:
+                return os.path.join(self.vectorstore_path, f.read().strip())
+        except FileNotFoundError:
+            # Stores saved before generations existed keep both files at the top level
+            return self.vectorstore_path
+    
     def load_vectorstore(self) -> None:
-        """Load an existing vectorstore."""
+        """Load an existing vectorstore, memory-mapping the index where FAISS supports it."""
         try:
-            self.vectorstore = FAISS.load_local(
-                self.vectorstore_path, 
-                self.embeddings,
-                allow_dangerous_deserialization=True
-            )
+            store_dir = self._store_dir()
+            index_path = os.path.join(store_dir, INDEX_FILE)
+            docstore_path = os.path.join(store_dir, DOCSTORE_FILE)
+            if os.path.exists(docstore_path):
+                index = _read_index(index_path)
+                documents, index_to_docstore_id = _read_docstore(docstore_path)
+                if index.ntotal != len(index_to_docstore_id):
+                    raise ValueError(
+                        f"index has {index.ntotal} vectors but docstore has {len(index_to_docstore_id)} documents"
+                    )
+                self.vectorstore = new_ip_vectorstore(
+                    self.embeddings, index, InMemoryDocstore(documents), index_to_docstore_id
+                )
+            else:
+                # Stores written before docstore.jsonl existed use LangChain's pickle format
+                self.vectorstore = load_ip_vectorstore(self.vectorstore_path, self.embeddings)
+            tune_index(self.vectorstore.index)
             self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": Config.RETRIEVAL_K})
         except Exception as e:
             raise FileNotFoundError(f"Could not load vectorstore from {self.vectorstore_path}: {e}")
     
     def save_vectorstore(self) -> None:
-        """Save the vectorstore to disk."""
-        if self.vectorstore:
-            self.vectorstore.save_local(self.vectorstore_path)
+        """Save the vectorstore to disk as one generation that replaces the previous one atomically.
+        
+        The index and docstore are written into a fresh generation directory, then the
+        CURRENT pointer is swapped with a single rename. A crash at any point leaves
+        CURRENT naming either the old pair or the new pair, never a mix of the two.
+        The previous generation is kept until the next save, so a reader that resolved
+        CURRENT just before the swap can still open it.
+        """
+        if not self.vectorstore:
+            return
+        
+        os.makedirs(self.vectorstore_path, exist_ok=True)
+        previous_dir = self._store_dir()
+        generation_dir = tempfile.mkdtemp(prefix="gen-", dir=self.vectorstore_path)
+        try:
+            faiss.write_index(self.vectorstore.index, os.path.join(generation_dir, INDEX_FILE))
+            with open(os.path.join(generation_dir, DOCSTORE_FILE), "w", encoding="utf-8") as f:
+                for position in range(len(self.vectorstore.index_to_docstore_id)):
+                    doc_id = self.vectorstore.index_to_docstore_id[position]
+                    doc = self.vectorstore.docstore.search(doc_id)
+                    f.write(json.dumps(
+                        {"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata},
+                        default=str,
+                    ) + "\n")
+            
+            current_tmp = os.path.join(self.vectorstore_path, CURRENT_FILE + ".tmp")
+            with open(current_tmp, "w", encoding="utf-8") as f:
+                f.write(os.path.basename(generation_dir))
+            os.replace(current_tmp, os.path.join(self.vectorstore_path, CURRENT_FILE))
+        except BaseException:
+            shutil.rmtree(generation_dir, ignore_errors=True)
+            raise
+        
+        # Anything older than the previous generation can no longer be resolved by a reader
+        keep = {generation_dir, previous_dir}
+        for name in os.listdir(self.vectorstore_path):
+            path = os.path.join(self.vectorstore_path, name)
+            if name.startswith("gen-") and path not in keep and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+        if self.vectorstore_path not in keep:
+            # Files from the top-level layout (and LangChain's pickle format) are superseded too
+            for name in (INDEX_FILE, DOCSTORE_FILE, "index.pkl"):
+                path = os.path.join(self.vectorstore_path, name)
+                if os.path.isfile(path):
+                    os.remove(path)
     
     def retrieve(self, question: str) -> List[Document]:
         """Retrieve relevant documents for a question."""
@@ -70,3 +306,28 @@ class GroqDocumentRetriever:
             raise ValueError("Vectorstore not initialized. Call create_vectorstore() or load_vectorstore() first.")
         
         return self.retriever.invoke(question)
+    
+    def retrieve_many(self, questions: List[str]) -> List[List[Document]]:
+        """Retrieve documents for several questions with one embedding call and one FAISS search."""
+        if not self.retriever:
+            raise ValueError("Vectorstore not initialized. Call create_vectorstore() or load_vectorstore() first.")
+        if not questions:
+            return []
+        
+        # Queries go straight to the model so they don't fill the on-disk chunk cache
+        embedder = self.embeddings.embeddings if isinstance(self.embeddings, CachedEmbeddings) else self.embeddings
+        queries = np.asarray(embedder.embed_documents(list(questions)), dtype=np.float32)
+        faiss.normalize_L2(queries)
+        
+        _, indices = self.vectorstore.index.search(queries, Config.RETRIEVAL_K)
+        index_to_id = self.vectorstore.index_to_docstore_id
+        docstore = self.vectorstore.docstore
+        # FAISS pads with -1 when fewer than k vectors exist
+        return [[docstore.search(index_to_id[i]) for i in row if i != -1] for row in indices]
+    
+    async def aretrieve(self, question: str) -> List[Document]:
+        """Async version of retrieve()."""
+        if not self.retriever:
+            raise ValueError("Vectorstore not initialized. Call create_vectorstore() or load_vectorstore() first.")
+        
+        return await self.retriever.ainvoke(question)
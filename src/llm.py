@@ -0,0 +1,30 @@
+"""
+Shared ChatGroq clients so every component reuses the same HTTP connection pool.
+"""
+
+from functools import lru_cache
+
+from langchain_core.language_models import BaseChatModel
+from langchain_groq import ChatGroq
+
+from .config import Config
+from .prompt_cache import get_prompt_cache
+
+
+@lru_cache(maxsize=None)
+def _base_chat_model(model_name: str, temperature: float) -> ChatGroq:
+    return ChatGroq(model=model_name, temperature=temperature)
+
+
+@lru_cache(maxsize=None)
+def get_chat_model(model_name: str = Config.DEFAULT_MODEL, temperature: float = Config.TEMPERATURE,
+                   use_prompt_cache: bool = False) -> BaseChatModel:
+    """Return the process-wide chat model for a model name and temperature.
+
+    The prompt-cached variant is a shallow copy of the base model, so both share the
+    underlying Groq client (and its keep-alive connections) and differ only in caching.
+    """
+    llm = _base_chat_model(model_name, temperature)
+    if use_prompt_cache:
+        return llm.model_copy(update={"cache": get_prompt_cache()})
+    return llm
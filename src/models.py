@@ -2,16 +2,21 @@
 Data models and type definitions for the Adaptive RAG system.
 """
 
-from typing import List, Literal
+from typing import List, Literal, Optional, Tuple
+
+from langchain_core.documents import Document
 from typing_extensions import TypedDict
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 
 class GraphState(TypedDict):
     """State of the adaptive RAG graph."""
     question: str
+    route: str  # Data source chosen by the router, reused on later passes
     generation: str
-    documents: List[str]
+    documents: Tuple[Document, ...]  # Immutable, so state updates share it instead of copying
+    prefetched_documents: Optional[Tuple[Document, ...]]  # Retrieval results fetched ahead of the graph
+    docs_text: str  # Joined document contents, built once per generation
     retry_count: int  # Track retries to prevent infinite loops
 
 
@@ -32,6 +37,22 @@ class GradeDocuments(BaseModel):
     )
 
 
+class GradeDocumentsBatch(BaseModel):
+    """Grade several documents for relevance to a question in one pass."""
+    
+    binary_scores: List[Literal["yes", "no"]] = Field(
+        description="One 'yes' or 'no' per document, in the order the documents are numbered"
+    )
+    
+    @field_validator("binary_scores", mode="before")
+    @classmethod
+    def _normalize_scores(cls, scores):
+        # Models sometimes answer 'Yes' / ' no'; accept those before the Literal check
+        if isinstance(scores, list):
+            return [score.strip().lower() if isinstance(score, str) else score for score in scores]
+        return scores
+
+
 class GradeHallucinations(BaseModel):
     """Binary score for hallucination present in generation answer."""
     
@@ -0,0 +1,55 @@
+"""
+Shared exact-match response cache for the grader and router LLM calls.
+"""
+
+from functools import lru_cache
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.outputs import Generation
+
+from .cache import LRUCache
+from .config import Config
+
+
+class LRUPromptCache(BaseCache):
+    """LangChain cache backed by the thread-safe LRUCache.
+
+    Graders and the router call the model from several threads at once, which
+    LangChain's own InMemoryCache does not guard against.
+    """
+
+    def __init__(self, maxsize: int = Config.PROMPT_CACHE_SIZE):
+        self._entries = LRUCache(maxsize=maxsize, ttl=None)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        return self._entries.get((prompt, llm_string))
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        self._entries.put((prompt, llm_string), return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        self._entries.clear()
+
+    # Lookups are in-memory, so skip the default executor round trip
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        return self.lookup(prompt, llm_string)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        self.update(prompt, llm_string, return_val)
+
+    async def aclear(self, **kwargs: Any) -> None:
+        self.clear(**kwargs)
+
+
+@lru_cache(maxsize=None)
+def get_prompt_cache() -> Optional[BaseCache]:
+    """Return the process-wide LLM response cache, or None when disabled.
+
+    LangChain keys entries on the full prompt plus the model parameters (including
+    any structured-output tool binding), so identical system prompt + input pairs
+    are answered without a Groq round trip while different graders never collide.
+    """
+    if not Config.ENABLE_PROMPT_CACHE:
+        return None
+    return LRUPromptCache(maxsize=Config.PROMPT_CACHE_SIZE)
@@ -0,0 +1,41 @@
+"""
+Query rewriter that reformulates a question for better retrieval on retries.
+"""
+
+from typing import Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from .config import Config
+from .llm import get_chat_model
+
+_REWRITE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a question re-writer that converts an input question to a better version that is optimized for retrieval.
+
+Look at the input and try to reason about the underlying semantic intent / meaning.
+
+Respond with the improved question only."""),
+    ("human", "Here is the initial question: \n\n {question} \n\n Formulate an improved question."),
+])
+
+
+class QueryRewriter:
+    """Rewrites questions into versions better suited to retrieval."""
+
+    def __init__(self, model_name: str = Config.DEFAULT_MODEL, llm: Optional[BaseChatModel] = None):
+        self.llm = llm or get_chat_model(model_name)
+
+        self.rewrite_prompt = _REWRITE_PROMPT
+        self.rewriter = self.rewrite_prompt | self.llm | StrOutputParser()
+
+    def rewrite(self, question: str) -> str:
+        """Rewrite a question, keeping the original if the model returns nothing."""
+        rewritten = self.rewriter.invoke({"question": question}).strip()
+        return rewritten or question
+
+    async def arewrite(self, question: str) -> str:
+        """Async version of rewrite()."""
+        rewritten = (await self.rewriter.ainvoke({"question": question})).strip()
+        return rewritten or question
@@ -2,38 +2,75 @@
 RAG chain for generating responses based on retrieved documents.
 """
 
-from typing import List
+import logging
+from typing import List, Optional, Sequence
+
 from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
 
 from .config import Config
+from .llm import get_chat_model
 
+logger = logging.getLogger(__name__)
 
-class RAGChain:
-    """Handles RAG generation using retrieved documents."""
-    
-    def __init__(self, model_name: str = Config.DEFAULT_MODEL):
-        self.llm = ChatGroq(model=model_name, temperature=Config.TEMPERATURE)
-        
-        template = """
+_RAG_PROMPT = ChatPromptTemplate.from_template("""
 You are a helpful assistant that answers questions based on the following context.
 Use the provided context to answer the question.
 
 Context: {context}
 Question: {question}
 Answer:
-"""
-        
-        self.prompt = ChatPromptTemplate.from_template(template)
+""")
+
+
+class RAGChain:
+    """Handles RAG generation using retrieved documents."""
+    
+    def __init__(self, model_name: str = Config.DEFAULT_MODEL, llm: Optional[BaseChatModel] = None):
+        self.llm = llm or get_chat_model(model_name)
+        self.prompt = _RAG_PROMPT
         self.chain = self.prompt | self.llm | StrOutputParser()
     
-    def format_docs(self, docs: List[Document]) -> str:
-        """Format documents into a single string."""
-        return "\n\n".join(doc.page_content for doc in docs)
+    def format_docs(self, docs: Sequence[Document], max_chars: Optional[int] = None) -> str:
+        """Format documents into a single string of at most max_chars (Config.MAX_CONTEXT_CHARS).
+        
+        Documents are kept in retrieval order, so the lowest-ranked ones are dropped first.
+        """
+        if max_chars is None:
+            max_chars = Config.MAX_CONTEXT_CHARS
+        
+        if not docs:
+            return ""
+        
+        if len(docs) == 1 or len(docs[0].page_content) >= max_chars:
+            # Web search results arrive as a single document; no join needed.
+            # An oversized top document is cut rather than dropped.
+            content = docs[0].page_content
+            if len(docs) > 1 or len(content) > max_chars:
+                logger.debug("Truncated context to the top document's first %d chars", max_chars)
+            return content[:max_chars]
+        
+        parts: List[str] = []
+        total = 0
+        for doc in docs:
+            added = len(doc.page_content) + (2 if parts else 0)
+            if total + added > max_chars:
+                logger.debug("Kept %d of %d documents to fit %d context chars", len(parts), len(docs), max_chars)
+                break
+            parts.append(doc.page_content)
+            total += added
+        return "\n\n".join(parts)
     
-    def generate(self, question: str, documents: List[Document]) -> str:
+    def generate(self, question: str, documents: Sequence[Document]) -> str:
         """Generate an answer based on the question and documents."""
-        context = self.format_docs(documents)
+        return self.generate_from_context(question, self.format_docs(documents))
+    
+    def generate_from_context(self, question: str, context: str) -> str:
+        """Generate an answer from an already formatted context string."""
         return self.chain.invoke({"context": context, "question": question})
+    
+    async def agenerate_from_context(self, question: str, context: str) -> str:
+        """Async version of generate_from_context()."""
+        return await self.chain.ainvoke({"context": context, "question": question})
@@ -3,10 +3,8 @@ Document retrieval and web search functionality.
 """
 
 from typing import List
+
 from langchain_core.documents import Document
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain_tavily import TavilySearch
 
 from .config import Config
 
@@ -15,24 +13,42 @@ class DocumentRetriever:
     """Handles document retrieval from vectorstore."""
     
     def __init__(self, vectorstore_path: str = Config.VECTOR_STORE_PATH):
+        # Imported here so web-search-only or HuggingFace setups never load the OpenAI client
+        from langchain_openai import OpenAIEmbeddings
+        
         self.vectorstore_path = vectorstore_path
-        self.embeddings = OpenAIEmbeddings(model=Config.EMBEDDING_MODEL)
+        self.embeddings = OpenAIEmbeddings(
+            model=Config.OPENAI_EMBEDDING_MODEL, chunk_size=Config.OPENAI_EMBED_CHUNK_SIZE
+        )
         self.vectorstore = None
         self.retriever = None
     
     def create_vectorstore(self, documents: List[Document]) -> None:
-        """Create a vectorstore from documents."""
-        self.vectorstore = FAISS.from_documents(documents, self.embeddings)
+        """Create an inner-product vectorstore from documents (flat or HNSW depending on size)."""
+        if not documents:
+            raise ValueError("Cannot create a vectorstore without documents.")
+        
+        # FAISS and the index builders are only loaded once a vectorstore is needed,
+        # so importing this module for WebSearcher stays cheap
+        import faiss
+        import numpy as np
+        from .groq_retrieval import build_index, new_ip_vectorstore
+        
+        texts = [doc.page_content for doc in documents]
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        faiss.normalize_L2(vectors)
+        
+        self.vectorstore = new_ip_vectorstore(self.embeddings, build_index(vectors))
+        self.vectorstore.add_embeddings(zip(texts, vectors), metadatas=[doc.metadata for doc in documents])
         self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": Config.RETRIEVAL_K})
     
     def load_vectorstore(self) -> None:
         """Load an existing vectorstore."""
+        from .groq_retrieval import load_ip_vectorstore, tune_index
+        
         try:
-            self.vectorstore = FAISS.load_local(
-                self.vectorstore_path, 
-                self.embeddings,
-                allow_dangerous_deserialization=True
-            )
+            self.vectorstore = load_ip_vectorstore(self.vectorstore_path, self.embeddings)
+            tune_index(self.vectorstore.index)
             self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": Config.RETRIEVAL_K})
         except Exception as e:
             raise FileNotFoundError(f"Could not load vectorstore from {self.vectorstore_path}: {e}")
@@ -53,32 +69,78 @@ class DocumentRetriever:
 class WebSearcher:
     """Handles web search functionality."""    
     def __init__(self, k: int = Config.WEB_SEARCH_K):
+        from langchain_tavily import TavilySearch
+        
         self.web_search_tool = TavilySearch(k=k)
     
     def search(self, question: str) -> Document:
         """Perform web search and return results as a Document."""
         try:
             docs = self.web_search_tool.invoke({"query": question})
-            
-            # Handle different response formats
-            if isinstance(docs, list):
-                # If docs is a list of dicts
-                if docs and isinstance(docs[0], dict):
-                    web_results = "\n".join([
-                        d.get("content", d.get("text", str(d))) 
-                        for d in docs
-                    ])
-                else:
-                    # If docs is a list of strings or other types
-                    web_results = "\n".join([str(d) for d in docs])
-            elif isinstance(docs, str):
-                # If docs is already a string
-                web_results = docs
-            else:
-                # Fallback - convert to string
-                web_results = str(docs)
-                
-            return Document(page_content=web_results)
+            return self._to_document(docs)
+        except Exception as e:
+            print(f"Web search error: {e}")
+            return Document(page_content=f"Web search failed: {e}")
+    
+    async def asearch(self, question: str) -> Document:
+        """Async version of search()."""
+        try:
+            docs = await self.web_search_tool.ainvoke({"query": question})
+            return self._to_document(docs)
         except Exception as e:
             print(f"Web search error: {e}")
             return Document(page_content=f"Web search failed: {e}")
+    
+    def search_many(self, questions: List[str]) -> List[Document]:
+        """Search for several questions concurrently, returning Documents in input order."""
+        if not questions:
+            return []
+        
+        responses = self.web_search_tool.batch(
+            [{"query": question} for question in questions],
+            config={"max_concurrency": Config.WEB_SEARCH_CONCURRENCY},
+            return_exceptions=True,
+        )
+        return [self._to_search_result(response) for response in responses]
+    
+    async def asearch_many(self, questions: List[str]) -> List[Document]:
+        """Async version of search_many()."""
+        if not questions:
+            return []
+        
+        responses = await self.web_search_tool.abatch(
+            [{"query": question} for question in questions],
+            config={"max_concurrency": Config.WEB_SEARCH_CONCURRENCY},
+            return_exceptions=True,
+        )
+        return [self._to_search_result(response) for response in responses]
+    
+    def _to_search_result(self, response) -> Document:
+        """Convert one batched response, reporting failures the same way search() does."""
+        if isinstance(response, Exception):
+            print(f"Web search error: {response}")
+            return Document(page_content=f"Web search failed: {response}")
+        return self._to_document(response)
+    
+    @staticmethod
+    def _to_document(docs) -> Document:
+        """Convert a Tavily response into a single Document."""
+        # Handle different response formats
+        if isinstance(docs, list):
+            # If docs is a list of dicts
+            if docs and isinstance(docs[0], dict):
+                web_results = "\n".join([
+                    d.get("content", d.get("text", str(d))) 
+                    for d in docs
+                ])
+            else:
+                # If docs is a list of strings or other types
+                web_results = "\n".join([str(d) for d in docs])
+        elif isinstance(docs, str):
+            # If docs is already a string
+            web_results = docs
+        else:
+            # Fallback - convert to string
+            web_results = str(docs)
+            
+        return Document(page_content=web_results)
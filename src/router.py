@@ -2,61 +2,114 @@
 Question router to determine the best data source for answering a query.
 """
 
+import re
+from typing import List, Optional
+
+from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
 
+from .cache import LRUCache, normalize_question
 from .models import RouteQuery
 from .config import Config
+from .llm import get_chat_model
 
+# Questions with these cues need fresh information, so they skip the router LLM
+_WEB_SEARCH_CUES = re.compile(r"\b(weather|today|current|latest|20\d{2}|news|price)\b", re.IGNORECASE)
 
-class QuestionRouter:
-    """Routes questions to the most appropriate data source."""
+_DEFAULT_TOPICS = [
+    "Finance and real estate",
+    "Library and research topics",
+    "Biology and microbiology",
+    "Literature and writing",
+    "Movies and entertainment",
+    "Animals and nature",
+    "History and geography",
+    "Astronomy",
+]
+
+
+def _build_route_prompt(topics: List[str]) -> ChatPromptTemplate:
+    """Build the router prompt for the topics held in the vectorstore."""
+    topics_text = "\n".join([f"- {topic}" for topic in topics])
     
-    def __init__(self, model_name: str = Config.ROUTER_MODEL):
-        self.llm = ChatGroq(model=model_name, temperature=Config.TEMPERATURE)
-        self.structured_llm = self.llm.with_structured_output(RouteQuery)
-        
-        # System prompt - customize based on your vectorstore content
-        system_prompt = """You are an expert at routing a user question to either a vectorstore or web search.
+    system_prompt = f"""You are an expert at routing a user question to either a vectorstore or web search.
 
 The vectorstore contains information on the following topics:
-- Finance and real estate
-- Library and research topics
-- Biology and microbiology
-- Literature and writing
-- Movies and entertainment
-- Animals and nature
-- History and geography
-- Astronomy
+{topics_text}
 
 If the question is related to these topics, route it to the vectorstore. Otherwise, use web search."""
+    
+    return ChatPromptTemplate.from_messages([
+        ("system", system_prompt),
+        ("human", "{question}"),
+    ])
+
+
+_ROUTE_PROMPT = _build_route_prompt(_DEFAULT_TOPICS)
+
+
+class QuestionRouter:
+    """Routes questions to the most appropriate data source."""
+    
+    def __init__(self, model_name: str = Config.ROUTER_MODEL, llm: Optional[BaseChatModel] = None):
+        self.llm = llm or get_chat_model(model_name, use_prompt_cache=True)
+        self.structured_llm = self.llm.with_structured_output(RouteQuery)
         
-        self.route_prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", "{question}"),
-        ])
-        
+        # Default topics - customize with update_topics() based on your vectorstore content
+        self.route_prompt = _ROUTE_PROMPT
         self.router = self.route_prompt | self.structured_llm
+        
+        # Routing is deterministic for a given prompt, so repeated questions reuse the decision
+        self._route_cache = LRUCache(maxsize=Config.ROUTER_CACHE_SIZE, ttl=None)
     
     def route(self, question: str) -> str:
         """Route a question to the appropriate data source."""
-        result = self.router.invoke({"question": question})
-        return result.datasource
-    
-    def update_topics(self, topics: list[str]) -> None:
-        """Update the topics in the vectorstore for better routing."""
-        topics_text = "\n".join([f"- {topic}" for topic in topics])
+        if Config.ROUTER_HEURISTICS and _WEB_SEARCH_CUES.search(question):
+            return "web_search"
         
-        system_prompt = f"""You are an expert at routing a user question to either a vectorstore or web search.
-
-The vectorstore contains information on the following topics:
-{topics_text}
-
-If the question is related to these topics, route it to the vectorstore. Otherwise, use web search."""
+        key = normalize_question(question)
+        datasource = self._route_cache.get(key)
+        if datasource is None:
+            datasource = self.router.invoke({"question": question}).datasource
+            self._route_cache.put(key, datasource)
+        return datasource
+    
+    async def aroute(self, question: str) -> str:
+        """Async version of route()."""
+        if Config.ROUTER_HEURISTICS and _WEB_SEARCH_CUES.search(question):
+            return "web_search"
         
-        self.route_prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", "{question}"),
-        ])
+        key = normalize_question(question)
+        datasource = self._route_cache.get(key)
+        if datasource is None:
+            datasource = (await self.router.ainvoke({"question": question})).datasource
+            self._route_cache.put(key, datasource)
+        return datasource
+    
+    def route_many(self, questions: List[str]) -> List[Optional[str]]:
+        """Route several questions with concurrent router calls; None marks a question that failed."""
+        routes: List[Optional[str]] = [
+            "web_search" if Config.ROUTER_HEURISTICS and _WEB_SEARCH_CUES.search(question)
+            else self._route_cache.get(normalize_question(question))
+            for question in questions
+        ]
+        pending = [i for i, route in enumerate(routes) if route is None]
+        if not pending:
+            return routes
         
+        results = self.router.batch(
+            [{"question": questions[i]} for i in pending],
+            config={"max_concurrency": Config.ROUTER_CONCURRENCY},
+            return_exceptions=True,
+        )
+        for i, result in zip(pending, results):
+            if isinstance(result, RouteQuery):
+                routes[i] = result.datasource
+                self._route_cache.put(normalize_question(questions[i]), result.datasource)
+        return routes
+    
+    def update_topics(self, topics: list[str]) -> None:
+        """Update the topics in the vectorstore for better routing."""
+        self.route_prompt = _build_route_prompt(topics)
         self.router = self.route_prompt | self.structured_llm
+        self._route_cache.clear()
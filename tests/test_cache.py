@@ -0,0 +1,79 @@
+"""
+Tests for the semantic answer cache.
+"""
+
+from typing import Dict, List
+
+import pytest
+
+from src.cache import SemanticCache
+
+
+class FakeEmbeddings:
+    """Maps each (normalized) question to a fixed vector and counts embedding calls."""
+
+    def __init__(self, vectors: Dict[str, List[float]]):
+        self.vectors = vectors
+        self.calls = 0
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        return self.vectors[text]
+
+
+@pytest.fixture
+def embeddings():
+    return FakeEmbeddings({
+        "what is rag?": [1.0, 0.0, 0.0],
+        "what does rag mean?": [0.99, 0.1, 0.0],
+        "who won the match?": [0.0, 1.0, 0.0],
+        "how do graders work?": [0.0, 0.0, 1.0],
+    })
+
+
+def test_miss_then_exact_hit_skips_embedding(embeddings):
+    cache = SemanticCache(embeddings, maxsize=4, threshold=0.95, ttl=None)
+
+    value, probe = cache.lookup("What is RAG?")
+    assert value is None
+    cache.store(probe, "answer")
+
+    calls = embeddings.calls
+    value, _ = cache.lookup("  what is   rag?")
+    assert value == "answer"
+    assert embeddings.calls == calls
+
+
+def test_paraphrase_hits_and_unrelated_question_misses(embeddings):
+    cache = SemanticCache(embeddings, maxsize=4, threshold=0.95, ttl=None)
+    cache.store(cache.lookup("What is RAG?")[1], "answer")
+
+    assert cache.lookup("What does RAG mean?")[0] == "answer"
+    assert cache.lookup("Who won the match?")[0] is None
+
+
+def test_eviction_frees_the_embedding_slot(embeddings):
+    cache = SemanticCache(embeddings, maxsize=2, threshold=0.95, ttl=None)
+    cache.store(cache.lookup("What is RAG?")[1], "rag")
+    cache.store(cache.lookup("Who won the match?")[1], "match")
+    cache.store(cache.lookup("How do graders work?")[1], "graders")
+
+    # The oldest entry is gone, and its paraphrase no longer matches its embedding
+    assert cache.lookup("What is RAG?")[0] is None
+    assert cache.lookup("What does RAG mean?")[0] is None
+    assert cache.lookup("Who won the match?")[0] == "match"
+    assert cache.lookup("How do graders work?")[0] == "graders"
+
+    # The freed slot is reused for the next question
+    cache.store(cache.lookup("What is RAG?")[1], "rag again")
+    assert cache.lookup("What does RAG mean?")[0] == "rag again"
+
+
+def test_clear_drops_exact_and_semantic_entries(embeddings):
+    cache = SemanticCache(embeddings, maxsize=4, threshold=0.95, ttl=None)
+    cache.store(cache.lookup("What is RAG?")[1], "answer")
+
+    cache.clear()
+
+    assert cache.lookup("What is RAG?")[0] is None
+    assert cache.lookup("What does RAG mean?")[0] is None
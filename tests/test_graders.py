@@ -0,0 +1,102 @@
+"""
+Tests for batched document grading and its per-document fallback.
+"""
+
+import asyncio
+import re
+from typing import Callable, Dict, List
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from src.config import Config
+from src.graders import DocumentGrader
+from src.models import GradeDocuments, GradeDocumentsBatch
+
+DOCUMENTS = ["relevant one", "off topic", "relevant two", "off topic again", "relevant three"]
+EXPECTED = ["yes", "no", "yes", "no", "yes"]
+
+
+class StubLLM:
+    """Stands in for a chat model; structured output is produced by a callable per schema."""
+
+    def __init__(self, responses: Dict[type, Callable[[str], object]]):
+        self.responses = responses
+        self.calls: List[type] = []
+
+    def with_structured_output(self, schema: type) -> RunnableLambda:
+        def respond(prompt) -> object:
+            self.calls.append(schema)
+            return self.responses[schema](prompt.to_string())
+        return RunnableLambda(respond)
+
+
+def _grade_one(prompt: str) -> GradeDocuments:
+    document = prompt.split("Retrieved document:", 1)[1].split("User question:", 1)[0]
+    return GradeDocuments(binary_score="yes" if "relevant" in document else "no")
+
+
+def _grade_numbered(prompt: str) -> List[str]:
+    documents = re.split(r"Document \d+:\n", prompt.split("User question:", 1)[0])[1:]
+    return ["yes" if "relevant" in document else "no" for document in documents]
+
+
+def _grader(batch_response: Callable[[str], object]) -> DocumentGrader:
+    llm = StubLLM({GradeDocuments: _grade_one, GradeDocumentsBatch: batch_response})
+    return DocumentGrader(llm=llm)
+
+
+def test_grade_batch_uses_one_call_per_chunk(monkeypatch):
+    monkeypatch.setattr(Config, "GRADER_BATCH_SIZE", 10)
+    grader = _grader(lambda prompt: GradeDocumentsBatch(binary_scores=_grade_numbered(prompt)))
+
+    assert grader.grade_batch("question", DOCUMENTS) == EXPECTED
+    assert grader.llm.calls == [GradeDocumentsBatch]
+
+
+def test_grade_batch_falls_back_when_score_count_is_wrong(monkeypatch):
+    monkeypatch.setattr(Config, "GRADER_BATCH_SIZE", 10)
+    grader = _grader(lambda prompt: GradeDocumentsBatch(binary_scores=_grade_numbered(prompt)[:-1]))
+
+    assert grader.grade_batch("question", DOCUMENTS) == EXPECTED
+    assert grader.llm.calls.count(GradeDocuments) == len(DOCUMENTS)
+
+
+def test_grade_batch_falls_back_when_the_batch_call_fails(monkeypatch):
+    monkeypatch.setattr(Config, "GRADER_BATCH_SIZE", 10)
+
+    def fail(prompt: str) -> object:
+        raise ValueError("malformed tool call")
+
+    grader = _grader(fail)
+
+    assert grader.grade_batch("question", DOCUMENTS) == EXPECTED
+
+
+def test_grade_batch_only_regrades_the_bad_chunk(monkeypatch):
+    monkeypatch.setattr(Config, "GRADER_BATCH_SIZE", 2)
+
+    def second_chunk_short(prompt: str) -> GradeDocumentsBatch:
+        scores = _grade_numbered(prompt)
+        return GradeDocumentsBatch(binary_scores=scores[:1] if "relevant two" in prompt else scores)
+
+    grader = _grader(second_chunk_short)
+
+    assert grader.grade_batch("question", DOCUMENTS) == EXPECTED
+    assert grader.llm.calls.count(GradeDocuments) == 2
+
+
+def test_agrade_batch_falls_back_when_score_count_is_wrong(monkeypatch):
+    monkeypatch.setattr(Config, "GRADER_BATCH_SIZE", 10)
+    grader = _grader(lambda prompt: GradeDocumentsBatch(binary_scores=_grade_numbered(prompt) + ["yes"]))
+
+    assert asyncio.run(grader.agrade_batch("question", DOCUMENTS)) == EXPECTED
+    assert grader.llm.calls.count(GradeDocuments) == len(DOCUMENTS)
+
+
+@pytest.mark.parametrize("documents", [[], ["relevant only"]])
+def test_grade_batch_skips_the_batch_prompt_for_small_inputs(documents):
+    grader = _grader(lambda prompt: pytest.fail("batch prompt should not be used"))
+
+    assert grader.grade_batch("question", documents) == ["yes"] * len(documents)
+    assert GradeDocumentsBatch not in grader.llm.calls
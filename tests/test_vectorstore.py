@@ -0,0 +1,85 @@
+"""
+Round-trip tests for saving and loading the FAISS vectorstore.
+"""
+
+import os
+
+import faiss
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.config import Config
+from src.groq_retrieval import CURRENT_FILE, AlternativeEmbeddings, GroqDocumentRetriever
+
+DOCUMENTS = [Document(page_content=f"doc {i}", metadata={"row": i}) for i in range(2000)]
+
+
+@pytest.fixture
+def retriever(tmp_path, monkeypatch):
+    embeddings = DeterministicFakeEmbedding(size=32)
+    monkeypatch.setattr(AlternativeEmbeddings, "get_embeddings", staticmethod(lambda: embeddings))
+    monkeypatch.setattr(Config, "USE_EMBEDDING_CACHE", False)
+    return GroqDocumentRetriever(vectorstore_path=str(tmp_path / "vectorstore"))
+
+
+@pytest.mark.parametrize("index_type, settings", [
+    (faiss.IndexFlatIP, {"HNSW_MIN_DOCS": 10_000, "USE_PQ": False}),
+    (faiss.IndexHNSWFlat, {"HNSW_MIN_DOCS": 10, "USE_PQ": False}),
+    (faiss.IndexIVFPQ, {"USE_PQ": True, "PQ_MIN_DOCS": 20}),
+])
+def test_round_trip(retriever, monkeypatch, index_type, settings):
+    for name, value in settings.items():
+        monkeypatch.setattr(Config, name, value)
+    retriever.create_vectorstore(DOCUMENTS)
+    assert isinstance(retriever.vectorstore.index, index_type)
+    before = retriever.retrieve("doc 7")
+
+    retriever.save_vectorstore()
+    retriever.load_vectorstore()
+
+    assert isinstance(retriever.vectorstore.index, index_type)
+    assert retriever.vectorstore.index.ntotal == len(DOCUMENTS)
+    after = retriever.retrieve("doc 7")
+    assert after[0].page_content == "doc 7"
+    assert after[0].metadata == {"row": 7}
+    assert [doc.page_content for doc in after] == [doc.page_content for doc in before]
+
+
+def test_loads_legacy_pickle_layout(retriever):
+    retriever.create_vectorstore(DOCUMENTS[:50])
+    retriever.vectorstore.save_local(retriever.vectorstore_path)
+    assert not os.path.exists(os.path.join(retriever.vectorstore_path, CURRENT_FILE))
+
+    retriever.load_vectorstore()
+
+    assert retriever.retrieve("doc 7")[0].metadata == {"row": 7}
+
+
+def test_save_keeps_only_current_and_previous_generation(retriever):
+    retriever.create_vectorstore(DOCUMENTS[:50])
+    retriever.vectorstore.save_local(retriever.vectorstore_path)
+
+    for _ in range(3):
+        retriever.save_vectorstore()
+
+    entries = sorted(os.listdir(retriever.vectorstore_path))
+    assert entries[0] == CURRENT_FILE
+    assert [name[:4] for name in entries[1:]] == ["gen-", "gen-"]
+
+    retriever.load_vectorstore()
+    assert retriever.retrieve("doc 7")[0].metadata == {"row": 7}
+
+
+def test_load_rejects_index_and_docstore_of_different_sizes(retriever):
+    retriever.create_vectorstore(DOCUMENTS[:50])
+    retriever.save_vectorstore()
+    with open(os.path.join(retriever.vectorstore_path, CURRENT_FILE), encoding="utf-8") as f:
+        docstore_path = os.path.join(retriever.vectorstore_path, f.read().strip(), "docstore.jsonl")
+    with open(docstore_path, encoding="utf-8") as f:
+        lines = f.readlines()
+    with open(docstore_path, "w", encoding="utf-8") as f:
+        f.writelines(lines[:-1])
+
+    with pytest.raises(FileNotFoundError):
+        retriever.load_vectorstore()